@@ -0,0 +1,50 @@
+"""
+Helpers shared by the benchmarks. This module imports neither Qt nor eventlet, so
+that `suite` can use it before choosing the hub of its processes. `LagMeter` imports
+them when it is created.
+"""
+import time
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def raiseFileLimit():
+    # raise the soft limit of open files to the hard one. return the limit, or None
+    # where it is unknown.
+    if resource is None:
+        return None
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    try:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        return hard
+    except (ValueError, OSError):
+        return soft
+
+
+def percentile(values, fraction):
+    # of values sorted in ascending order.
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class LagMeter:
+    """A QTimer fires every `interval` seconds, and its lateness is the lag of the event loop."""
+    def __init__(self, interval = 0.01):
+        from hgoldfish.utils import eventlet
+        self.interval = interval
+        self.timer = eventlet.QtCore.QTimer()
+        self.timer.timeout.connect(self.tick)
+        self.lags = []
+
+    def start(self):
+        self.last = time.time()
+        self.timer.start(int(self.interval * 1000))
+
+    def stop(self):
+        self.timer.stop()
+
+    def tick(self):
+        now = time.time()
+        self.lags.append(max(now - self.last - self.interval, 0))
+        self.last = now
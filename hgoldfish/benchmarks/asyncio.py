@@ -0,0 +1,94 @@
+"""
+Round trips between greenlets and asyncio coroutines, with the asyncio loop
+running on the hub, against a loop running in a thread of its own.
+
+* greenlet -> coroutine: a greenlet waits for `asyncio.sleep(0)`.
+* coroutine -> greenlet: a coroutine waits for a greenlet which returns at once.
+
+    python -m hgoldfish.benchmarks.asyncio [seconds]
+
+Python 3.5 or later is required.
+"""
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import sys, time, threading, asyncio
+from hgoldfish.utils import eventlet
+from hgoldfish.utils import asyncio as qasyncio
+QCoreApplication = eventlet.QtCore.QCoreApplication
+
+
+def rate(duration, call):
+    count = 0
+    started = time.time()
+    while time.time() - started < duration:
+        for i in range(100):
+            call()
+        count += 100
+    return count / (time.time() - started)
+
+
+def sharedLoop(duration):
+    greenletToCoroutine = rate(duration, lambda: qasyncio.awaitCoroutine(asyncio.sleep(0)))
+
+    async def callGreenlets():
+        count = 0
+        started = time.time()
+        while time.time() - started < duration:
+            await qasyncio.runInGreenlet(lambda: None)
+            count += 1
+        return count / (time.time() - started)
+    coroutineToGreenlet = qasyncio.awaitCoroutine(callGreenlets())
+    return greenletToCoroutine, coroutineToGreenlet
+
+
+def threadedLoop(duration):
+    # the usual way: a loop in another thread, and `callFromThread()` back to the hub.
+    loop = asyncio.new_event_loop()
+    t = threading.Thread(target = loop.run_forever)
+    t.start()
+    hub = eventlet.get_hub()
+    try:
+        def awaitInThread():
+            future = asyncio.run_coroutine_threadsafe(asyncio.sleep(0), loop)
+            done = eventlet.Event()
+            future.add_done_callback(lambda future: hub.callFromThread(done.send, None))
+            done.wait()
+        greenletToCoroutine = rate(duration, awaitInThread)
+
+        async def callGreenlets():
+            count = 0
+            started = time.time()
+            while time.time() - started < duration:
+                future = loop.create_future()
+                def run():
+                    loop.call_soon_threadsafe(future.set_result, None)
+                hub.callFromThread(eventlet.spawn, run)
+                await future
+                count += 1
+            return count / (time.time() - started)
+        result = asyncio.run_coroutine_threadsafe(callGreenlets(), loop)
+        coroutineToGreenlet = eventlet.runInNewThread(result.result)
+        return greenletToCoroutine, coroutineToGreenlet
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        eventlet.runInNewThread(t.join)
+        loop.close()
+
+
+def benchmark(duration):
+    try:
+        print("%-20s %22s %22s" % ("asyncio loop", "greenlet -> coroutine", "coroutine -> greenlet"))
+        for name, measure in (("on the hub", sharedLoop), ("in a thread", threadedLoop)):
+            greenletToCoroutine, coroutineToGreenlet = measure(duration)
+            print("%-20s %20.0f/s %20.0f/s" % (name, greenletToCoroutine, coroutineToGreenlet))
+    finally:
+        eventlet.stop_application()
+
+
+if __name__ == "__main__":
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    app = QCoreApplication([])
+    eventlet.spawn(benchmark, duration)
+    eventlet.start_application()
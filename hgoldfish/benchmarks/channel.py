@@ -0,0 +1,82 @@
+"""
+Throughput of `Channel` between a thread and a greenlet, in both directions,
+with one item per call and with batches.
+
+    python -m hgoldfish.benchmarks.channel [count]
+"""
+from __future__ import print_function
+from __future__ import division
+
+import sys, time, threading
+from hgoldfish.utils import eventlet
+QCoreApplication = eventlet.QtCore.QCoreApplication
+
+BATCH = 100
+
+
+def threadToGreenlet(count, batch):
+    channel = eventlet.Channel()
+    def produce():
+        if batch:
+            for i in range(0, count, BATCH):
+                channel.putMany(range(i, min(i + BATCH, count)))
+        else:
+            for i in range(count):
+                channel.put(i)
+        channel.close()
+    started = time.time()
+    t = threading.Thread(target = produce)
+    t.start()
+    received = 0
+    try:
+        while True:
+            received += len(channel.getMany() if batch else [channel.get()])
+    except eventlet.ChannelClosed:
+        pass
+    elapsed = time.time() - started
+    t.join()
+    assert received == count
+    return count / elapsed
+
+
+def greenletToThread(count, batch):
+    channel = eventlet.Channel()
+    received = [0]
+    def consume():
+        try:
+            while True:
+                received[0] += len(channel.getMany() if batch else [channel.get()])
+        except eventlet.ChannelClosed:
+            pass
+    started = time.time()
+    t = threading.Thread(target = consume)
+    t.start()
+    if batch:
+        for i in range(0, count, BATCH):
+            channel.putMany(range(i, min(i + BATCH, count)))
+    else:
+        for i in range(count):
+            channel.put(i)
+    channel.close()
+    while t.is_alive():
+        eventlet.sleep(0.001)
+    elapsed = time.time() - started
+    assert received[0] == count
+    return count / elapsed
+
+
+def benchmark(count):
+    try:
+        for batch in (False, True):
+            mode = "batch of %d" % BATCH if batch else "one by one"
+            print("%-12s thread -> greenlet: %10.0f items/s" % (mode, threadToGreenlet(count, batch)))
+            print("%-12s greenlet -> thread: %10.0f items/s" % (mode, greenletToThread(count, batch)))
+    finally:
+        eventlet.stop_application()
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    app = QCoreApplication([])
+    eventlet.spawn(benchmark, count)
+    eventlet.start_application()
@@ -0,0 +1,112 @@
+"""
+Streaming a large file from a greenlet: plain blocking reads, `runInNewThread()`
+for every chunk, and `GreenFile` with read-ahead, copied by `readinto()`, viewed
+by `iterChunks()` and served from a memory map. Reported are the throughput and
+the lag of the event loop meanwhile.
+
+A QTimer fires every 10ms and its lateness is the lag. The file is written just
+before, so it is read from the page cache. A cold disk makes the blocking reads
+much worse.
+
+    python -m hgoldfish.benchmarks.files [megabytes]
+"""
+from __future__ import print_function
+from __future__ import division
+
+import sys, os, time, tempfile
+from hgoldfish.utils import eventlet
+from hgoldfish.benchmarks._common import LagMeter, percentile
+QCoreApplication = eventlet.QtCore.QCoreApplication
+
+INTERVAL = 0.01
+CHUNK = 1024 * 1024
+ROUNDS = 3
+
+
+def blocking(path):
+    total = 0
+    with open(path, "rb", 0) as f:
+        buffer = bytearray(CHUNK)
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                return total
+            total += n
+
+
+def threadPerChunk(path):
+    total = 0
+    with open(path, "rb", 0) as f:
+        buffer = bytearray(CHUNK)
+        while True:
+            n = eventlet.runInNewThread(f.readinto, buffer)
+            if not n:
+                return total
+            total += n
+
+
+def greenReadinto(path):
+    total = 0
+    with eventlet.openFile(path, chunkSize = CHUNK) as f:
+        buffer = bytearray(CHUNK)
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                return total
+            total += n
+
+
+def greenChunks(path, mapped = False):
+    total = 0
+    with eventlet.openFile(path, chunkSize = CHUNK, mapped = mapped) as f:
+        for chunk in f.iterChunks():
+            total += len(chunk)
+            chunk.release()
+    return total
+
+
+def measure(read, path):
+    meter = LagMeter(INTERVAL)
+    total = 0
+    # let the timer tick before the first read.
+    meter.start()
+    eventlet.sleep(INTERVAL * 2)
+    started = time.time()
+    for i in range(ROUNDS):
+        total += read(path)
+    elapsed = time.time() - started
+    # and the tick which was late for the last read.
+    eventlet.sleep(INTERVAL * 2)
+    meter.stop()
+    lags = sorted(meter.lags) or [0.0]
+    p99 = percentile(lags, 0.99)
+    return total / elapsed / 1024 / 1024, sum(lags) / len(lags) * 1000, p99 * 1000, lags[-1] * 1000
+
+
+def benchmark(megabytes):
+    fd, path = tempfile.mkstemp()
+    try:
+        block = os.urandom(CHUNK)
+        with os.fdopen(fd, "wb") as f:
+            for i in range(megabytes):
+                f.write(block)
+        readers = (
+            ("blocking read", blocking),
+            ("runInNewThread", threadPerChunk),
+            ("GreenFile.readinto", greenReadinto),
+            ("GreenFile.iterChunks", greenChunks),
+            ("mapped iterChunks", lambda path: greenChunks(path, True)),
+        )
+        print("%-22s %10s %14s %14s %14s" % ("reader", "MB/s", "mean lag ms", "p99 lag ms", "max lag ms"))
+        for name, read in readers:
+            print("%-22s %10.0f %14.2f %14.2f %14.2f" % ((name, ) + measure(read, path)))
+    finally:
+        os.remove(path)
+        eventlet.stop_application()
+
+
+if __name__ == "__main__":
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 512
+    app = QCoreApplication([])
+    eventlet.spawn(benchmark, megabytes)
+    eventlet.start_application()
@@ -0,0 +1,149 @@
+"""
+Requests per second of the green HTTP client on QNetworkAccessManager against
+a local HTTP/1.1 keep-alive server, side by side with `requests` patched by
+`eventlet.import_patched()` and with green `http.client`, keeping one connection
+per greenlet. Every client fetches small and large bodies from 1 and from 50
+greenlets.
+
+    python -m hgoldfish.benchmarks.http [requests]
+
+The server runs in its own process. `requests` is skipped if it is not installed.
+"""
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+
+import sys, time, subprocess
+
+SIZES = (("1k", 1024), ("1M", 1024 * 1024))
+CONCURRENCY = (1, 50)
+
+
+def serve():
+    try:
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+        from socketserver import ThreadingMixIn
+    except ImportError:
+        from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+        from SocketServer import ThreadingMixIn
+
+    payloads = dict((name, b"x" * size) for name, size in SIZES)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # headers and body are written separately.
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            body = payloads.get(self.path.lstrip("/"), b"")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingMixIn, HTTPServer):
+        daemon_threads = True
+        request_queue_size = 1024
+
+    server = Server(("127.0.0.1", 0), Handler)
+    print(server.server_address[1])
+    sys.stdout.flush()
+    server.serve_forever()
+
+
+def qtClient():
+    from hgoldfish.utils import http
+    session = http.HttpSession()
+    def fetch(url):
+        return len(session.get(url).content())
+    return fetch
+
+
+def requestsClient():
+    from hgoldfish.utils import eventlet
+    requests = eventlet.import_patched("requests")
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections = 1, pool_maxsize = max(CONCURRENCY))
+    session.mount("http://", adapter)
+    def fetch(url):
+        return len(session.get(url).content)
+    return fetch
+
+
+def httpClientClient():
+    from eventlet.green.http import client
+    from hgoldfish.utils import eventlet
+    try:
+        from urllib.parse import urlsplit
+    except ImportError:
+        from urlparse import urlsplit
+    connections = {}
+    def fetch(url):
+        parts = urlsplit(url)
+        current = eventlet.getcurrent()
+        if current not in connections:
+            connections[current] = client.HTTPConnection(parts.hostname, parts.port)
+        connection = connections[current]
+        connection.request("GET", parts.path)
+        return len(connection.getresponse().read())
+    return fetch
+
+
+def measure(fetch, url, count, concurrency):
+    from hgoldfish.utils import eventlet
+    def worker(n):
+        for i in range(n):
+            fetch(url)
+    operations = eventlet.GreenletGroup()
+    # warm up the connections.
+    operations.map(worker, [1] * concurrency)
+    started = time.time()
+    operations.map(worker, [count // concurrency] * concurrency)
+    return (count // concurrency * concurrency) / (time.time() - started)
+
+
+def benchmark(port, count):
+    from hgoldfish.utils import eventlet
+    clients = [("QNetworkAccessManager", qtClient), ("requests", requestsClient),
+               ("http.client", httpClientClient)]
+    try:
+        print("%-24s %6s %12s %14s" % ("client", "body", "greenlets", "requests/s"))
+        for name, makeClient in clients:
+            try:
+                fetch = makeClient()
+            except ImportError:
+                print("%-24s skipped, not installed." % name)
+                continue
+            for sizeName, size in SIZES:
+                url = "http://127.0.0.1:%d/%s" % (port, sizeName)
+                for concurrency in CONCURRENCY:
+                    n = count if size < 65536 else max(count // 10, concurrency)
+                    print("%-24s %6s %12d %14.0f" % (name, sizeName, concurrency, measure(fetch, url, n, concurrency)))
+    finally:
+        eventlet.stop_application()
+
+
+def main(count):
+    from hgoldfish.utils import eventlet
+    QCoreApplication = eventlet.QtCore.QCoreApplication
+    server = subprocess.Popen([sys.executable, "-m", "hgoldfish.benchmarks.http", "--serve"],
+            stdout = subprocess.PIPE)
+    try:
+        port = int(server.stdout.readline())
+        app = QCoreApplication([])
+        eventlet.spawn(benchmark, port, count)
+        eventlet.start_application()
+    finally:
+        server.kill()
+        server.wait()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--serve"]:
+        serve()
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,91 @@
+"""
+Throughput of downloads on the main hub against downloads spread over the hubs
+of a `HubPool`, and the lag of the main thread's event loop meanwhile.
+
+Every download is a local socket pair, one greenlet writes 64k chunks and
+another reads them and hashes them with SHA-256, which releases the GIL. A
+QTimer of the main thread fires every 10ms and its lateness is the lag.
+
+    python -m hgoldfish.benchmarks.hubs [downloads] [threads...]
+"""
+from __future__ import print_function
+from __future__ import division
+
+import sys, time, hashlib
+from hgoldfish.utils import eventlet
+from eventlet.green import socket
+from hgoldfish.benchmarks._common import LagMeter, percentile
+QCoreApplication = eventlet.QtCore.QCoreApplication
+
+DURATION = 2.0
+INTERVAL = 0.01
+CHUNK = b"x" * 65536
+
+
+def writer(sock, stopAt):
+    try:
+        while time.time() < stopAt:
+            sock.sendall(CHUNK)
+    except socket.error:
+        pass
+    finally:
+        sock.close()
+
+
+def download(stopAt):
+    a, b = socket.socketpair()
+    t = eventlet.spawn(writer, a, stopAt)
+    received = 0
+    try:
+        while True:
+            data = b.recv(len(CHUNK))
+            if not data:
+                break
+            hashlib.sha256(data).digest()
+            received += len(data)
+    finally:
+        b.close()
+        t.wait()
+    return received
+
+
+def measure(downloads, threads):
+    meter = LagMeter(INTERVAL)
+    pool = eventlet.HubPool(threads) if threads else None
+    try:
+        started = time.time()
+        stopAt = started + DURATION
+        meter.start()
+        if pool is None:
+            results = [eventlet.spawn(download, stopAt) for i in range(downloads)]
+        else:
+            results = [pool.spawn(download, stopAt) for i in range(downloads)]
+        received = sum(result.wait() for result in results)
+        elapsed = time.time() - started
+        meter.stop()
+    finally:
+        if pool is not None:
+            pool.stop()
+            pool.join()
+    lags = sorted(meter.lags) or [0.0]
+    p99 = percentile(lags, 0.99)
+    return received / elapsed / 1024 / 1024, sum(lags) / len(lags) * 1000, p99 * 1000
+
+
+def benchmark(downloads, threadCounts):
+    try:
+        print("%-16s %10s %12s %16s %16s" % ("hubs", "downloads", "MB/s", "main lag ms", "main p99 ms"))
+        for threads in [0] + threadCounts:
+            throughput, lag, p99 = measure(downloads, threads)
+            name = "main only" if threads == 0 else "%d HubThreads" % threads
+            print("%-16s %10d %12.1f %16.2f %16.2f" % (name, downloads, throughput, lag, p99))
+    finally:
+        eventlet.stop_application()
+
+
+if __name__ == "__main__":
+    downloads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    threadCounts = [int(arg) for arg in sys.argv[2:]] or [1, 2, 4]
+    app = QCoreApplication([])
+    eventlet.spawn(benchmark, downloads, threadCounts)
+    eventlet.start_application()
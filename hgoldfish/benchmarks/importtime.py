@@ -0,0 +1,48 @@
+"""
+Import time of `hgoldfish.utils.eventlet`, measured with `python -X importtime`
+in fresh interpreters: importing the module alone, and importing it and using
+one of its names, which imports Qt and eventlet as well.
+
+    python -m hgoldfish.benchmarks.importtime [runs]
+
+Python 3.7 or later is required.
+"""
+from __future__ import print_function
+from __future__ import division
+
+import sys, subprocess
+
+CASES = [
+    ("import only", "import hgoldfish.utils.eventlet"),
+    ("first use", "import hgoldfish.utils.eventlet as e; e.GreenletGroup"),
+]
+
+
+def importTime(code):
+    # the sum of the cumulative microseconds of the top level imports.
+    output = subprocess.check_output([sys.executable, "-X", "importtime", "-c", code],
+            stderr = subprocess.STDOUT).decode("utf-8")
+    total = 0
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        if not fields[2].startswith("  "):
+            total += int(fields[1])
+    return total / 1000
+
+
+def benchmark(runs):
+    # the modules imported by the interpreter itself are not counted.
+    startup = min(importTime("pass") for i in range(runs))
+    print("%-12s %12s %12s" % ("case", "best ms", "median ms"))
+    for name, code in CASES:
+        times = sorted(importTime(code) - startup for i in range(runs))
+        print("%-12s %12.1f %12.1f" % (name, times[0], times[len(times) // 2]))
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    benchmark(runs)
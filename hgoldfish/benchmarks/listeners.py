@@ -0,0 +1,105 @@
+"""
+Compare QtHub's per-fd QSocketNotifier mode with its epoll mode, which
+watches every socket through one QSocketNotifier.
+
+For 1k, 5k and 10k local socket pairs it measures:
+
+* idle: one pair ping-pongs while every other pair has a greenlet waiting
+  to read, as in a proxy with many idle connections.
+* busy: every pair ping-pongs at the same time.
+
+    python -m hgoldfish.benchmarks.listeners [pairs...]
+
+Each pair needs two file descriptors. Counts beyond the open file limit are
+lowered to fit it.
+"""
+from __future__ import print_function
+from __future__ import division
+
+import sys, time
+from hgoldfish.utils import eventlet
+from hgoldfish.benchmarks._common import raiseFileLimit
+from eventlet.green import socket
+from eventlet.hubs import get_hub
+QCoreApplication = eventlet.QtCore.QCoreApplication
+
+DURATION = 2.0
+
+
+def echo(sock):
+    try:
+        while True:
+            data = sock.recv(1)
+            if not data:
+                break
+            sock.sendall(data)
+    except socket.error:
+        pass
+
+
+def measureIdle(pairs):
+    a = pairs[0][0]
+    messages = 0
+    started = time.time()
+    while time.time() - started < DURATION:
+        for i in range(100):
+            a.sendall(b"x")
+            a.recv(1)
+        messages += 100
+    return messages / (time.time() - started)
+
+
+def measureBusy(pairs):
+    messages = 0
+    started = time.time()
+    while time.time() - started < DURATION:
+        for a, b in pairs:
+            a.sendall(b"x")
+        for a, b in pairs:
+            a.recv(1)
+        messages += len(pairs)
+    return messages / (time.time() - started)
+
+
+def measure(count):
+    pairs = [socket.socketpair() for i in range(count)]
+    operations = eventlet.GreenletGroup()
+    echoes = [operations.spawn(echo, b) for a, b in pairs]
+    eventlet.sleep(0.1)
+    try:
+        return measureIdle(pairs), measureBusy(pairs)
+    finally:
+        # the echo greenlets must be gone before their file descriptors are reused.
+        for a, b in pairs:
+            a.close()
+        for g in echoes:
+            g.wait()
+        for a, b in pairs:
+            b.close()
+
+
+def benchmark(counts):
+    hub = get_hub()
+    try:
+        print("%-10s %8s %14s %14s" % ("mode", "pairs", "idle msg/s", "busy msg/s"))
+        for count in counts:
+            for useEpoll in (False, True):
+                hub.useEpoll = useEpoll
+                idle, busy = measure(count)
+                mode = "epoll" if useEpoll else "per-fd"
+                print("%-10s %8d %14.0f %14.0f" % (mode, count, idle, busy))
+    finally:
+        eventlet.stop_application()
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [1000, 5000, 10000]
+    limit = raiseFileLimit()
+    if limit is not None:
+        maxPairs = (limit - 100) // 2
+        if max(counts) > maxPairs:
+            print("open file limit is %d, using at most %d pairs." % (limit, maxPairs))
+            counts = sorted(set(min(count, maxPairs) for count in counts))
+    app = QCoreApplication([])
+    eventlet.spawn(benchmark, counts)
+    eventlet.start_application()
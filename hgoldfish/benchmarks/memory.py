@@ -0,0 +1,115 @@
+"""
+Memory used by the hub per idle connection and per pending timeout, at a scale
+of 10k, 50k and 100k.
+
+* idle connection: a greenlet of a `GreenletGroup` blocked in `recv()` of a green
+  UDP socket, which never receives anything. Once with a QSocketNotifier per socket, and once with
+  `QtHub.useEpoll`.
+* pending timeout: an `eventlet.Timeout(3600)` started and left pending. Once
+  with the single QTimer of the hub, and once with `QtHub.singleTimer = False`.
+
+`traced` is the growth of the Python heap as seen by tracemalloc, and `rss` the
+growth of the resident memory, which includes the Qt objects. Scales which need
+more file descriptors than RLIMIT_NOFILE allows are skipped.
+
+    python -m hgoldfish.benchmarks.memory [count...]
+"""
+from __future__ import print_function
+from __future__ import division
+
+import sys, os, gc, select, tracemalloc
+from hgoldfish.utils import eventlet
+from hgoldfish.benchmarks._common import raiseFileLimit
+from eventlet.green import socket
+QCoreApplication = eventlet.QtCore.QCoreApplication
+
+
+def residentMemory():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def measure(count, setUp, tearDown):
+    gc.collect()
+    tracedBefore, rssBefore = tracemalloc.get_traced_memory()[0], residentMemory()
+    state = setUp(count)
+    gc.collect()
+    traced = (tracemalloc.get_traced_memory()[0] - tracedBefore) / count
+    rss = residentMemory()
+    rss = (rss - rssBefore) / count if rss is not None and rssBefore is not None else None
+    tearDown(state)
+    return traced, rss
+
+
+def idle(sock, started):
+    started[0] += 1
+    sock.recv(1)
+
+
+def openConnections(count):
+    sockets = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for i in range(count)]
+    started = [0]
+    operations = eventlet.GreenletGroup()
+    greenlets = [operations.spawn(idle, sock, started) for sock in sockets]
+    while started[0] < count:
+        eventlet.sleep(0.01)
+    # every greenlet has reached `recv()` and waits for its listener.
+    eventlet.sleep(0.01)
+    return sockets, greenlets, operations
+
+
+def closeConnections(state):
+    sockets, greenlets, operations = state
+    for g in greenlets:
+        g.kill()
+    for sock in sockets:
+        sock.close()
+
+
+def startTimeouts(count):
+    return [eventlet.Timeout(3600) for i in range(count)]
+
+
+def cancelTimeouts(timeouts):
+    for timeout in timeouts:
+        timeout.cancel()
+
+
+def benchmark(counts):
+    hub = eventlet.get_hub()
+    useEpoll, singleTimer = hub.useEpoll, hub.singleTimer
+    limit = raiseFileLimit()
+    tracemalloc.start()
+    try:
+        print("%-32s %10s %14s %14s" % ("item", "count", "traced B/item", "rss B/item"))
+        for count in counts:
+            cases = [
+                ("idle connection, notifiers", "useEpoll", False, openConnections, closeConnections),
+                ("idle connection, epoll", "useEpoll", True, openConnections, closeConnections),
+                ("pending timeout, one QTimer", "singleTimer", True, startTimeouts, cancelTimeouts),
+                ("pending timeout, Qt timer each", "singleTimer", False, startTimeouts, cancelTimeouts),
+            ]
+            for name, option, value, setUp, tearDown in cases:
+                if option == "useEpoll" and (value and not hasattr(select, "epoll") \
+                        or limit is not None and count + 64 > limit):
+                    print("%-32s %10d %14s %14s" % (name, count, "skipped", "skipped"))
+                    continue
+                setattr(hub, option, value)
+                try:
+                    traced, rss = measure(count, setUp, tearDown)
+                finally:
+                    hub.useEpoll, hub.singleTimer = useEpoll, singleTimer
+                print("%-32s %10d %14.0f %14s" % (name, count, traced, "%.0f" % rss if rss is not None else "-"))
+    finally:
+        tracemalloc.stop()
+        eventlet.stop_application()
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [10000, 50000, 100000]
+    app = QCoreApplication([])
+    eventlet.spawn(benchmark, counts)
+    eventlet.start_application()
@@ -0,0 +1,127 @@
+"""
+Input-to-paint latency of the Qt event loop while 1k downloads are in flight,
+with the downloads running at NORMAL and at BACKGROUND priority.
+
+A thread plays the window system and posts an input event every 10ms. Its
+handler posts a paint event, as `QWidget.update()` does, and the latency is
+the time from posting the input event to handling the paint event. Every
+download is a local socket pair, one greenlet writes 16k chunks and another
+reads and hashes them.
+
+    python -m hgoldfish.benchmarks.priority [downloads]
+
+Each download needs two file descriptors. Counts beyond the open file limit
+are lowered to fit it.
+"""
+from __future__ import print_function
+from __future__ import division
+
+import sys, time, threading, hashlib, collections
+from hgoldfish.utils import eventlet
+from hgoldfish.benchmarks._common import raiseFileLimit, percentile
+from eventlet.green import socket
+QCoreApplication, QObject, QEvent = eventlet.QtCore.QCoreApplication, eventlet.QtCore.QObject, eventlet.QtCore.QEvent
+
+DURATION = 3.0
+INTERVAL = 0.01
+CHUNK = b"x" * 16384
+INPUT = QEvent.Type(QEvent.registerEventType())
+PAINT = QEvent.Type(QEvent.registerEventType())
+
+
+class Window(QObject):
+    def __init__(self):
+        QObject.__init__(self)
+        self.posted = collections.deque()
+        self.latencies = []
+
+    def postInput(self):
+        # called from the input thread.
+        self.posted.append(time.time())
+        QCoreApplication.postEvent(self, QEvent(INPUT))
+
+    def customEvent(self, event):
+        if event.type() == INPUT:
+            QCoreApplication.postEvent(self, QEvent(PAINT))
+        elif event.type() == PAINT:
+            self.latencies.append(time.time() - self.posted.popleft())
+
+
+def writer(sock, stopping):
+    try:
+        while not stopping[0]:
+            sock.sendall(CHUNK)
+    except socket.error:
+        pass
+    finally:
+        sock.close()
+
+
+def reader(sock, received):
+    try:
+        while True:
+            data = sock.recv(len(CHUNK))
+            if not data:
+                break
+            hashlib.sha1(data).digest()
+            received[0] += len(data)
+    except socket.error:
+        pass
+    finally:
+        sock.close()
+
+
+def measure(window, downloads, priority):
+    pairs = [socket.socketpair() for i in range(downloads)]
+    operations = eventlet.GreenletGroup(priority = priority)
+    received, stopping = [0], [False]
+    greenlets = []
+    for a, b in pairs:
+        greenlets.append(operations.spawn(writer, a, stopping))
+        greenlets.append(operations.spawn(reader, b, received))
+    eventlet.sleep(0.5)
+    del window.latencies[:]
+    stopped = threading.Event()
+    def postInputs():
+        while not stopped.wait(INTERVAL):
+            window.postInput()
+    t = threading.Thread(target = postInputs)
+    started, receivedBefore = time.time(), received[0]
+    t.start()
+    eventlet.sleep(DURATION)
+    stopped.set()
+    t.join()
+    throughput = (received[0] - receivedBefore) / (time.time() - started)
+    while window.posted:
+        eventlet.sleep(0.01)
+    latencies = sorted(window.latencies)
+    # the greenlets must be gone before their file descriptors are closed.
+    # killing them one by one takes a loop iteration each, so let them finish.
+    stopping[0] = True
+    for g in greenlets:
+        g.wait()
+    mean = sum(latencies) / len(latencies)
+    p99 = percentile(latencies, 0.99)
+    return mean * 1000, p99 * 1000, throughput / 1024 / 1024
+
+
+def benchmark(downloads):
+    window = Window()
+    try:
+        print("%-12s %10s %14s %14s %12s" % ("priority", "downloads", "mean ms", "p99 ms", "MB/s"))
+        for name, priority in (("NORMAL", eventlet.NORMAL), ("BACKGROUND", eventlet.BACKGROUND)):
+            mean, p99, throughput = measure(window, downloads, priority)
+            print("%-12s %10d %14.2f %14.2f %12.1f" % (name, downloads, mean, p99, throughput))
+    finally:
+        eventlet.stop_application()
+
+
+if __name__ == "__main__":
+    downloads = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    limit = raiseFileLimit()
+    if limit is not None and downloads > (limit - 100) // 2:
+        downloads = (limit - 100) // 2
+        print("open file limit is %d, using %d downloads." % (limit, downloads))
+    app = QCoreApplication([])
+    eventlet.spawn(benchmark, downloads)
+    eventlet.start_application()
@@ -0,0 +1,80 @@
+"""
+CPU bound work offloaded with `runInNewThread()` against `runInProcess()`: the
+time to finish the work and the lag of the event loop meanwhile. And the round
+trip of a large `bytes` payload through `runInProcess()`, pickled through the
+pipe against passed through shared memory.
+
+A QTimer fires every 10ms and its lateness is the lag.
+
+    python -m hgoldfish.benchmarks.process [tasks]
+"""
+from __future__ import print_function
+from __future__ import division
+
+import sys, os, time
+from hgoldfish.utils import eventlet
+from hgoldfish.benchmarks._common import LagMeter, percentile
+QCoreApplication = eventlet.QtCore.QCoreApplication
+
+INTERVAL = 0.01
+WORK = 1000000
+PAYLOAD = 16 * 1024 * 1024
+ROUNDS = 10
+
+
+def crunch(n):
+    total = 0
+    for i in range(n):
+        total += i * i
+    return total
+
+
+def echo(data):
+    return data
+
+
+def offload(runner, tasks):
+    meter = LagMeter(INTERVAL)
+    operations = eventlet.GreenletGroup()
+    started = time.time()
+    meter.start()
+    operations.map(lambda i: runner(crunch, WORK), range(tasks))
+    elapsed = time.time() - started
+    meter.stop()
+    lags = sorted(meter.lags) or [0.0]
+    p99 = percentile(lags, 0.99)
+    return elapsed, sum(lags) / len(lags) * 1000, p99 * 1000
+
+
+def payload(threshold):
+    pool = eventlet.getProcessPool()
+    pool.sharedMemoryThreshold = threshold
+    data = os.urandom(PAYLOAD)
+    eventlet.runInProcess(echo, b"")
+    started = time.time()
+    for i in range(ROUNDS):
+        assert len(eventlet.runInProcess(echo, data)) == PAYLOAD
+    return (time.time() - started) / ROUNDS * 1000
+
+
+def benchmark(tasks):
+    try:
+        # start the worker processes before measuring.
+        eventlet.GreenletGroup().map(lambda i: eventlet.runInProcess(crunch, 1), range(tasks))
+        print("%-16s %8s %12s %16s %16s" % ("offload", "tasks", "seconds", "mean lag ms", "p99 lag ms"))
+        for name, runner in (("runInNewThread", eventlet.runInNewThread), ("runInProcess", eventlet.runInProcess)):
+            elapsed, lag, p99 = offload(runner, tasks)
+            print("%-16s %8d %12.2f %16.2f %16.2f" % (name, tasks, elapsed, lag, p99))
+        print()
+        print("%-16s %12s %16s" % ("payload", "MB", "round trip ms"))
+        for name, threshold in (("pickled", None), ("shared memory", 65536)):
+            print("%-16s %12d %16.1f" % (name, PAYLOAD // 1024 // 1024, payload(threshold)))
+    finally:
+        eventlet.stop_application()
+
+
+if __name__ == "__main__":
+    tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    app = QCoreApplication([])
+    eventlet.spawn(benchmark, tasks)
+    eventlet.start_application()
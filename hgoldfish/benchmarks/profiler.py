@@ -0,0 +1,52 @@
+"""
+The overhead of `GreenletProfiler`: the yield rate of 100 greenlets calling
+`sleep(0)`, without the profiler, with it, and with stack sampling.
+
+    python -m hgoldfish.benchmarks.profiler [seconds]
+"""
+from __future__ import print_function
+from __future__ import division
+
+import sys, time
+from hgoldfish.utils import eventlet
+QCoreApplication = eventlet.QtCore.QCoreApplication
+
+GREENLETS = 100
+
+
+def yielder(stopAt, counter):
+    while time.time() < stopAt:
+        eventlet.sleep(0)
+        counter[0] += 1
+
+
+def yieldRate(duration):
+    counter = [0]
+    operations = eventlet.GreenletGroup(name = "yielders")
+    started = time.time()
+    operations.map(lambda i: yielder(started + duration, counter), range(GREENLETS))
+    return counter[0] / (time.time() - started)
+
+
+def benchmark(duration):
+    try:
+        print("%-24s %14s %10s" % ("profiler", "yields/s", "overhead"))
+        baseline = yieldRate(duration)
+        print("%-24s %14.0f %10s" % ("off", baseline, "-"))
+        for name, sampleInterval in (("on", None), ("on, sampling 1ms", 0.001)):
+            profiler = eventlet.GreenletProfiler(sampleInterval = sampleInterval)
+            profiler.start()
+            try:
+                rate = yieldRate(duration)
+            finally:
+                profiler.stop()
+            print("%-24s %14.0f %9.0f%%" % (name, rate, (baseline / rate - 1) * 100))
+    finally:
+        eventlet.stop_application()
+
+
+if __name__ == "__main__":
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    app = QCoreApplication([])
+    eventlet.spawn(benchmark, duration)
+    eventlet.start_application()
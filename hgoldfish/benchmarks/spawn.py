@@ -0,0 +1,49 @@
+"""
+Spawn/exit throughput of `GreenletGroup.spawn()` in chunks of 10k greenlets.
+Every chunk should take about the same time, however many greenlets the
+group and the hub are tracking already.
+
+    python -m hgoldfish.benchmarks.spawn [count]
+"""
+from __future__ import print_function
+from __future__ import division
+
+import sys, time
+from hgoldfish.utils import eventlet
+QCoreApplication = eventlet.QtCore.QCoreApplication
+
+CHUNK = 10000
+
+
+def benchmark(count):
+    operations = eventlet.GreenletGroup()
+    gate = eventlet.Event()
+    exited = []
+    def work():
+        gate.wait()
+        exited.append(time.time())
+    try:
+        spawned = [time.time()]
+        for i in range(count):
+            operations.spawn(work)
+            if (i + 1) % CHUNK == 0:
+                spawned.append(time.time())
+        started = time.time()
+        gate.send(None)
+        while len(exited) < count:
+            eventlet.sleep(0.01)
+        print("chunk      spawn/s       exit/s")
+        for i in range(count // CHUNK):
+            spawnTime = spawned[i + 1] - spawned[i]
+            exitEnd = exited[(i + 1) * CHUNK - 1]
+            exitStart = exited[i * CHUNK - 1] if i > 0 else started
+            print("%5d %12.0f %12.0f" % (i, CHUNK / spawnTime, CHUNK / max(exitEnd - exitStart, 1e-9)))
+    finally:
+        eventlet.stop_application()
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    app = QCoreApplication([])
+    eventlet.spawn(benchmark, count)
+    eventlet.start_application()
@@ -0,0 +1,236 @@
+"""
+Benchmark QtHub against eventlet's stock epoll hub, side by side.
+
+Every hub runs in its own process, headless on a QCoreApplication with the
+offscreen platform for QtHub. The suite measures:
+
+* spawn/exit throughput of greenthreads.
+* the yield rate of `sleep(0)`.
+* timer create/cancel rate.
+* `Event` fan-out to 10k waiting greenthreads.
+* echo round-trip latency and throughput over a loopback echo server, from
+  10 to 10k connections.
+* `runInNewThread()` round-trip, against `eventlet.tpool.execute()` for the
+  stock hub.
+
+    python -m hgoldfish.benchmarks.suite [connections...]
+
+Each connection needs two file descriptors. Counts beyond the open file limit
+are lowered to fit it.
+"""
+from __future__ import print_function
+from __future__ import division
+
+import sys, os, time, json, subprocess
+from hgoldfish.benchmarks._common import raiseFileLimit
+
+DURATION = 1.0
+COUNT = 10000
+PAYLOAD = b"x" * 64
+HUBS = ("qt", "epolls")
+
+
+def spawnExit():
+    import eventlet
+    started = time.time()
+    threads = [eventlet.spawn(lambda: None) for i in range(COUNT)]
+    for t in threads:
+        t.wait()
+    return COUNT / (time.time() - started)
+
+
+def yieldRate():
+    import eventlet
+    count = 0
+    started = time.time()
+    while time.time() - started < DURATION:
+        for i in range(1000):
+            eventlet.sleep(0)
+        count += 1000
+    return count / (time.time() - started)
+
+
+def timerCreateCancel():
+    from eventlet.hubs import get_hub
+    hub = get_hub()
+    noop = lambda: None
+    count = 0
+    started = time.time()
+    while time.time() - started < DURATION:
+        for i in range(1000):
+            hub.schedule_call_global(60, noop).cancel()
+        count += 1000
+    return count / (time.time() - started)
+
+
+def eventFanOut():
+    import eventlet
+    from eventlet.event import Event
+    event, done = Event(), Event()
+    waiting, woken = [0], [0]
+    def waiter():
+        waiting[0] += 1
+        event.wait()
+        woken[0] += 1
+        if woken[0] == COUNT:
+            done.send(None)
+    for i in range(COUNT):
+        eventlet.spawn(waiter)
+    while waiting[0] < COUNT:
+        eventlet.sleep(0.01)
+    started = time.time()
+    event.send(None)
+    done.wait()
+    return COUNT / (time.time() - started)
+
+
+def threadRoundTrip(runInThread):
+    count = 0
+    started = time.time()
+    while time.time() - started < DURATION:
+        runInThread(lambda: None)
+        count += 1
+    return count / (time.time() - started)
+
+
+def recvExactly(sock, size):
+    received = 0
+    while received < size:
+        data = sock.recv(size - received)
+        if not data:
+            raise EOFError()
+        received += len(data)
+
+
+def echo(sock):
+    try:
+        while True:
+            data = sock.recv(4096)
+            if not data:
+                break
+            sock.sendall(data)
+    except EOFError:
+        pass
+    finally:
+        sock.close()
+
+
+def echoRoundTrip(connections):
+    import eventlet
+    server = eventlet.listen(("127.0.0.1", 0), backlog = 1024)
+    handlers = []
+    def serve():
+        while len(handlers) < connections:
+            sock, address = server.accept()
+            handlers.append(eventlet.spawn(echo, sock))
+    acceptor = eventlet.spawn(serve)
+    clients = [eventlet.connect(server.getsockname()) for i in range(connections)]
+    acceptor.wait()
+    def client(sock, stopAt):
+        count, busy = 0, 0.0
+        while True:
+            sent = time.time()
+            if sent >= stopAt:
+                return count, busy
+            sock.sendall(PAYLOAD)
+            recvExactly(sock, len(PAYLOAD))
+            busy += time.time() - sent
+            count += 1
+    try:
+        started = time.time()
+        threads = [eventlet.spawn(client, sock, started + DURATION) for sock in clients]
+        results = [t.wait() for t in threads]
+        elapsed = time.time() - started
+    finally:
+        # the echo greenthreads must be gone before their file descriptors are reused.
+        for sock in clients:
+            sock.close()
+        for t in handlers:
+            t.wait()
+        server.close()
+    count = sum(r[0] for r in results)
+    busy = sum(r[1] for r in results)
+    return count / elapsed, busy / max(count, 1) * 1000
+
+
+def runSuite(runInThread, connectionCounts):
+    results = [
+        ("spawn/exit", "greenlets/s", spawnExit()),
+        ("sleep(0)", "yields/s", yieldRate()),
+        ("timer create/cancel", "timers/s", timerCreateCancel()),
+        ("Event fan-out", "wakeups/s", eventFanOut()),
+        ("thread round-trip", "calls/s", threadRoundTrip(runInThread)),
+    ]
+    for connections in connectionCounts:
+        throughput, latency = echoRoundTrip(connections)
+        results.append(("echo x%d" % connections, "msg/s", throughput))
+        results.append(("echo x%d latency" % connections, "ms", latency))
+    return results
+
+
+def runQtHub(connectionCounts):
+    from hgoldfish.utils import eventlet
+    QCoreApplication = eventlet.QtCore.QCoreApplication
+    results = []
+    def main():
+        try:
+            results.extend(runSuite(eventlet.runInNewThread, connectionCounts))
+        finally:
+            eventlet.stop_application()
+    app = QCoreApplication([])
+    eventlet.spawn(main)
+    eventlet.start_application()
+    return results
+
+
+def runStockHub(connectionCounts):
+    from eventlet import hubs, tpool
+    try:
+        hubs.use_hub("epolls")
+    except ImportError:
+        hubs.use_hub()
+    try:
+        return runSuite(tpool.execute, connectionCounts)
+    finally:
+        tpool.killall()
+
+
+def runChild(hub, connectionCounts):
+    if hub == "qt":
+        results = runQtHub(connectionCounts)
+    else:
+        results = runStockHub(connectionCounts)
+    print(json.dumps(results))
+
+
+def runParent(connectionCounts):
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    columns = {}
+    for hub in HUBS:
+        command = [sys.executable, "-m", "hgoldfish.benchmarks.suite", "--hub", hub] + [str(c) for c in connectionCounts]
+        output = subprocess.check_output(command, env = env)
+        columns[hub] = json.loads(output.decode("utf-8").strip().splitlines()[-1])
+    print("%-24s %-12s %14s %14s %8s" % ("benchmark", "unit", "QtHub", "epolls", "ratio"))
+    for (name, unit, qt), (_, _, stock) in zip(columns["qt"], columns["epolls"]):
+        ratio = qt / stock if stock else float("nan")
+        print("%-24s %-12s %14.2f %14.2f %8.2f" % (name, unit, qt, stock, ratio))
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    hub = None
+    if args[:1] == ["--hub"]:
+        hub, args = args[1], args[2:]
+    connectionCounts = [int(arg) for arg in args] or [10, 100, 1000, 10000]
+    limit = raiseFileLimit()
+    if limit is not None:
+        maxConnections = (limit - 100) // 2
+        if max(connectionCounts) > maxConnections:
+            if hub is None:
+                print("open file limit is %d, using at most %d connections." % (limit, maxConnections))
+            connectionCounts = sorted(set(min(c, maxConnections) for c in connectionCounts))
+    if hub is None:
+        runParent(connectionCounts)
+    else:
+        runChild(hub, connectionCounts)
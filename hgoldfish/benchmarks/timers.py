@@ -0,0 +1,56 @@
+"""
+Compare the timer throughput of QtHub's single-QTimer scheduler with the
+per-timer mode, which starts one Qt timer per eventlet timer.
+
+    python -m hgoldfish.benchmarks.timers [count]
+"""
+from __future__ import print_function
+from __future__ import division
+
+import sys, time
+from hgoldfish.utils import eventlet
+from eventlet.hubs import get_hub
+QCoreApplication = eventlet.QtCore.QCoreApplication
+
+
+def fireTimers(count):
+    hub = get_hub()
+    done = eventlet.Event()
+    fired = [0]
+    def callback():
+        fired[0] += 1
+        if fired[0] == count:
+            done.send(None)
+    started = time.time()
+    for i in range(count):
+        hub.schedule_call_global((i % 10) / 1000, callback)
+    done.wait()
+    return count / (time.time() - started)
+
+
+def cancelTimers(count):
+    hub = get_hub()
+    started = time.time()
+    timers = [hub.schedule_call_global(60, lambda: None) for i in range(count)]
+    for timer in timers:
+        timer.cancel()
+    return count / (time.time() - started)
+
+
+def benchmark(count):
+    hub = get_hub()
+    try:
+        for singleTimer in (False, True):
+            hub.singleTimer = singleTimer
+            name = "single QTimer" if singleTimer else "Qt timer per timer"
+            print("%-20s fire: %10.0f timers/s" % (name, fireTimers(count)))
+            print("%-20s cancel: %8.0f timers/s" % (name, cancelTimers(count)))
+    finally:
+        eventlet.stop_application()
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    app = QCoreApplication([])
+    eventlet.spawn(benchmark, count)
+    eventlet.start_application()
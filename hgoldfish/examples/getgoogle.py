@@ -18,6 +18,8 @@ class TestWidget(QTextBrowser):
         QTextBrowser.__init__(self)
         self.operations = eventlet.GreenletGroup()
         self.setPlainText("click middle button to navigate www.163.com")
+        # appending every number would relayout the browser each time.
+        self.numbers = eventlet.ThrottledUpdater(self.appendNumbers, interval = 0.1, accumulate = True)
 
     def mousePressEvent(self, event):
         if event.button() == Qt.MidButton:
@@ -28,14 +30,18 @@ class TestWidget(QTextBrowser):
     def printNumbers(self):
         i = 0
         while True:
-            eventlet.sleep(0.1)
+            eventlet.sleep(0.01)
             i += 1
-            self.append(str(i))
+            self.numbers.push(str(i))
+
+    def appendNumbers(self, numbers):
+        self.append("\n".join(numbers))
 
     def getpage(self):
         page = urlopen("http://www.163.com/").read().decode("gbk", "replace")
         self.setPlainText(page)
         self.operations.kill("print_number")
+        self.numbers.cancel()
 
 if __name__ == "__main__":
     app = QApplication([])
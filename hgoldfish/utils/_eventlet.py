@@ -0,0 +1,2637 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import absolute_import
+try:
+    str = unicode
+except NameError:
+    pass
+
+"""
+The implementation of `hgoldfish.utils.eventlet`, which imports it the first time
+one of its names is used. See the documentation over there.
+"""
+import sys, time, types, logging, functools, inspect, weakref, heapq, threading, traceback, math, collections, errno, bisect
+import io, os, mmap, multiprocessing
+from hgoldfish.utils.eventlet import _importQtCore, setQtBinding, getQtBinding
+QtCore = _importQtCore()
+Qt, QSocketNotifier, QTimer, QEvent, QCoreApplication, QObject = QtCore.Qt, QtCore.QSocketNotifier, \
+        QtCore.QTimer, QtCore.QEvent, QtCore.QCoreApplication, QtCore.QObject
+QEventLoop, QThread = QtCore.QEventLoop, QtCore.QThread
+from eventlet import spawn, sleep, spawn_after, kill, Timeout, with_timeout, GreenPool, \
+        GreenPile, Queue, import_patched, connect, listen, getcurrent, monkey_patch
+from eventlet.hubs import use_hub, get_hub, trampoline
+from eventlet.hubs.hub import BaseHub, closed_callback
+from eventlet import patcher
+from eventlet.support import greenlets as greenlet, clear_sys_exc_info
+from eventlet.event import Event as _Event
+from eventlet.greenthread import GreenThread
+from eventlet.semaphore import Semaphore
+from eventlet.green import socket
+from hgoldfish.utils import _process
+
+select = patcher.original("select")
+
+def _enum(cls, scope, name):
+    # PyQt6 only has scoped enums, and takes the priority of `postEvent()` as an int.
+    value = getattr(cls, name, None)
+    if value is None:
+        value = getattr(getattr(cls, scope, None), name, None)
+    return value
+
+_READ_NOTIFIER = _enum(QSocketNotifier, "Type", "Read")
+_WRITE_NOTIFIER = _enum(QSocketNotifier, "Type", "Write")
+_USER_EVENT = _enum(QEvent, "Type", "User")
+_PRECISE_TIMER = _enum(Qt, "TimerType", "PreciseTimer")
+_UNIQUE_CONNECTION = _enum(Qt, "ConnectionType", "UniqueConnection")
+_LOW_EVENT_PRIORITY = _enum(Qt, "EventPriority", "LowEventPriority")
+_LOW_EVENT_PRIORITY = int(getattr(_LOW_EVENT_PRIORITY, "value", _LOW_EVENT_PRIORITY))
+# the `activated` signal of PySide6 passes a QSocketDescriptor, which does not tell the file descriptor.
+_ACTIVATED_PASSES_FILENO = getQtBinding() != "PySide6"
+
+logger = logging.getLogger("hgoldfish.utils.eventlet")
+
+__all__ = ["GreenletGroup", "runInNewThread", "start_application", "stop_application", \
+        "ThreadPool", "getThreadPool", "setThreadPool", "runInProcess", "ProcessPool", \
+        "getProcessPool", "setProcessPool", "openFile", "GreenFile", "INTERACTIVE", "NORMAL", "BACKGROUND", \
+        "ThrottledUpdater", "Channel", "ChannelClosed", "GreenletProfiler", "HubThread", "HubPool", "HubFuture", "spawnOnHub", \
+        "SystemExceptions", "scheduleCall", "exc_clear", "runLocalLoop", "runDialog", \
+        "callMethodInEventLoop", "spawnInGreenlet", "setQtBinding", "getQtBinding", "QtCore"]
+__all__ += ["sleep", "spawn", "spawn_after", "kill", "Timeout", "with_timeout", \
+        "GreenPool", "GreenPile", "Queue", "import_patched", "monkey_patch", \
+        "connect", "listen", "getcurrent", "GreenletExit", "Event", "socket", "Semaphore"] #from eventlet
+
+GreenletExit = greenlet.GreenletExit
+try:
+    ReferenceError
+except NameError:
+    ReferenceError = weakref.ReferenceError
+SystemExceptions = (GreenletExit, SystemExit, ReferenceError)
+
+exc_clear = clear_sys_exc_info
+
+try:
+    _clock = time.monotonic
+except AttributeError:
+    _clock = time.time
+
+def scheduleCall(func, *args, **kwargs):
+    def wrapper():
+        try:
+            func(*args, **kwargs)
+        except:
+            logger.exception("an unexpected exception occured in scheduleCall().")
+    get_hub().schedule_call_global(0, wrapper)
+
+def _execMethod(loop):
+    # `exec_()` is gone in PyQt6, and `exec` is a keyword of Python 2 so it is looked up by name.
+    f = getattr(loop, "exec", None)
+    if f is None:
+        f = getattr(loop, "exec_")
+    return f
+
+def runLocalLoop(localLoop):
+    return callMethodInEventLoop(_execMethod(localLoop))
+
+runDialog = runLocalLoop
+
+def callMethodInEventLoop(func, *args, **kwargs):
+    if not get_hub().running or getcurrent() is get_hub().greenlet:
+        return func(*args, **kwargs)
+
+    done = Event()
+    def wrapper():
+        assert getcurrent() is get_hub().greenlet
+        try:
+            result = func(*args, **kwargs)
+            done.send(result)
+        except Exception as e:
+            done.send_exception(e)
+    clear_sys_exc_info()
+    get_hub().schedule_call_global(0, wrapper)
+    return done.wait()
+
+class QtListener(object):
+    # eventlet's FdListener without the instance dict, as every waiting socket has one.
+    # The QSocketNotifiers are owned and reused by the hub, see `QtHub.notifiers`.
+    __slots__ = ("evtype", "fileno", "cb", "tb", "mark_as_closed", "spent", "greenlet")
+
+    def __init__(self, evtype, fileno, cb, tb = None, mark_as_closed = None):
+        self.evtype = evtype
+        self.fileno = fileno
+        self.cb = cb
+        self.tb = tb
+        self.mark_as_closed = mark_as_closed
+        self.spent = False
+        self.greenlet = getcurrent()
+
+    def __repr__(self):
+        return "%s(%r, %r, %r, %r)" % (type(self).__name__, self.evtype, self.fileno, self.cb, self.tb)
+
+    def defang(self):
+        self.cb = closed_callback
+        if self.mark_as_closed is not None:
+            self.mark_as_closed()
+        self.spent = True
+
+
+_NO_KWARGS = {}
+
+class _Timer(object):
+    # eventlet's Timer without the instance dict, for `schedule_call_global()`. The
+    # other slots are set by QtHub.
+    __slots__ = ("seconds", "tpl", "called", "scheduled_time", "_priority", "_deferred", "_timerId")
+
+    def __init__(self, seconds, cb, *args, **kwargs):
+        self.seconds = seconds
+        # almost no timer has keyword arguments, do not keep an empty dict for each.
+        self.tpl = cb, args, kwargs or _NO_KWARGS
+        self.called = False
+
+    @property
+    def pending(self):
+        return not self.called
+
+    def __repr__(self):
+        cb, args, kwargs = getattr(self, "tpl", (None, None, None))
+        return "Timer(%s, %s, *%s, **%s)" % (self.seconds, cb, args, kwargs)
+
+    def copy(self):
+        cb, args, kwargs = self.tpl
+        return self.__class__(self.seconds, cb, *args, **kwargs)
+
+    def schedule(self):
+        self.called = False
+        self.scheduled_time = get_hub().add_timer(self)
+        return self
+
+    def __call__(self, *args):
+        if not self.called:
+            self.called = True
+            cb, args, kwargs = self.tpl
+            try:
+                cb(*args, **kwargs)
+            finally:
+                try:
+                    del self.tpl
+                except AttributeError:
+                    pass
+
+    def cancel(self):
+        if not self.called:
+            self.called = True
+            get_hub().timer_canceled(self)
+            try:
+                del self.tpl
+            except AttributeError:
+                pass
+
+    def __lt__(self, other):
+        return id(self) < id(other)
+
+
+class _LocalTimer(_Timer):
+    # for `schedule_call_local()`, not called if its greenlet has exited.
+    __slots__ = ("greenlet", )
+
+    def __init__(self, seconds, cb, *args, **kwargs):
+        self.greenlet = getcurrent()
+        _Timer.__init__(self, seconds, cb, *args, **kwargs)
+
+    @property
+    def pending(self):
+        if self.greenlet is None or self.greenlet.dead:
+            return False
+        return not self.called
+
+    def __call__(self, *args):
+        if not self.called:
+            self.called = True
+            if self.greenlet is not None and self.greenlet.dead:
+                return
+            cb, args, kwargs = self.tpl
+            cb(*args, **kwargs)
+
+    def cancel(self):
+        self.greenlet = None
+        _Timer.cancel(self)
+
+
+class _PostedEventReceiver(QObject):
+    def __init__(self, callback):
+        QObject.__init__(self)
+        self.callback = callback
+
+    def customEvent(self, event):
+        self.callback()
+
+
+class _TimerEventReceiver(QObject):
+    def __init__(self, callback):
+        QObject.__init__(self)
+        self.callback = callback
+
+    def timerEvent(self, event):
+        self.callback(event.timerId())
+
+
+# greenlet -> the name it was given in its GreenletGroup, for the watchdog reports.
+_greenletNames = weakref.WeakKeyDictionary()
+
+# priority classes of greenlets. see `GreenletGroup(priority = ...)`.
+INTERACTIVE, NORMAL, BACKGROUND = 0, 1, 2
+
+# greenlet -> priority, only for greenlets which are not NORMAL. QtHub skips
+# all priority lookups while it is empty.
+_greenletPriorities = weakref.WeakKeyDictionary()
+
+class _Watchdog(threading.Thread):
+    def __init__(self, hub, threshold, callback):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.hub = hub
+        self.threshold = threshold
+        self.callback = callback
+        self.hubThreadId = threading.current_thread().ident
+        self.stopped = threading.Event()
+
+    def run(self):
+        reportedBeat = None
+        while not self.stopped.wait(self.threshold / 4):
+            beat = self.hub.heartbeat
+            lag = self.hub.clock() - beat
+            # report a stall once, the heartbeat moves on when the loop comes back.
+            if lag < self.threshold or beat == reportedBeat:
+                continue
+            reportedBeat = beat
+            frame = sys._current_frames().get(self.hubThreadId)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+            greenlet = self.hub.runningGreenlet
+            name = _greenletNames.get(greenlet) if greenlet is not None else None
+            try:
+                self.callback(greenlet, name, stack, lag)
+            except:
+                logger.exception("the watchdog callback failed.")
+            del frame, greenlet
+
+    def stop(self):
+        self.stopped.set()
+
+
+def _reportStall(greenlet, name, stack, lag):
+    logger.warning("the event loop is blocked for %.3f seconds by greenlet %r (name: %r):\n%s", lag, greenlet, name, stack)
+
+
+# greenlet -> the name of its GreenletGroup, for groups which have one.
+_greenletGroups = weakref.WeakKeyDictionary()
+
+try:
+    _threadTime = time.thread_time
+except AttributeError:
+    _threadTime = getattr(time, "process_time", time.clock)
+
+
+class _ProfileRecord:
+    def __init__(self, label):
+        self.label = label
+        self.cpu = 0.0
+        self.wall = 0.0
+        self.switches = 0
+        self.maxSlice = 0.0
+        self.sliceHistogram = [0] * (len(_CALLBACK_BUCKETS) + 1)
+
+    def add(self, wall, cpu):
+        self.wall += wall
+        self.cpu += cpu
+        if wall > self.maxSlice:
+            self.maxSlice = wall
+        self.sliceHistogram[bisect.bisect(_CALLBACK_BUCKETS, wall)] += 1
+
+    def stats(self):
+        return {
+            "cpu": self.cpu,
+            "wall": self.wall,
+            "switches": self.switches,
+            "slices": sum(self.sliceHistogram),
+            "maxSlice": self.maxSlice,
+            "sliceHistogram": collections.OrderedDict(zip(_CALLBACK_BUCKET_NAMES, self.sliceHistogram)),
+        }
+
+
+class _StackSampler(threading.Thread):
+    def __init__(self, profiler, interval):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.profiler = profiler
+        self.interval = interval
+        self.hubThreadId = threading.current_thread().ident
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.hubThreadId)
+            if frame is not None:
+                self.profiler._sample(frame)
+            del frame
+
+    def stop(self):
+        self.stopped.set()
+
+
+class GreenletProfiler:
+    """Attribute the time of the hub's thread to the greenlets which spent it.
+
+    A greenlet tracer measures every time slice, from switching into a greenlet to
+    switching out, in CPU time and wall time. A slice whose wall time exceeds its CPU
+    time blocked the thread. The slices are aggregated per greenlet, per name and per
+    group, see `GreenletGroup(name = ...)`. With `sampleInterval`, a thread samples the
+    stack of the running greenlet for `dumpCollapsedStacks()`.
+    """
+    def __init__(self, sampleInterval = None):
+        self.sampleInterval = sampleInterval
+        self.greenlets = weakref.WeakKeyDictionary()
+        self.names = {}
+        self.groups = {}
+        self.stacks = collections.Counter()
+        self.sampler = None
+        self.previousTracer = None
+        self.running = False
+        self.current = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.current = getcurrent()
+        self.currentRecords = self._records(self.current)
+        self.lastWall, self.lastCpu = _clock(), _threadTime()
+        self.previousTracer = greenlet.greenlet.settrace(self._trace)
+        if self.sampleInterval is not None:
+            self.sampler = _StackSampler(self, self.sampleInterval)
+            self.sampler.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self._account(getcurrent())
+        self.running = False
+        if self.sampler is not None:
+            self.sampler.stop()
+            self.sampler = None
+        if greenlet.greenlet.gettrace() == self._trace:
+            greenlet.greenlet.settrace(self.previousTracer)
+            self.previousTracer = None
+        # otherwise a later tracer chains to this one, which passes the events on.
+        self.current = self.currentRecords = None
+
+    def clear(self):
+        self.greenlets.clear()
+        self.names.clear()
+        self.groups.clear()
+        self.stacks.clear()
+
+    def _trace(self, event, args):
+        # the hot path, called on every switch.
+        if self.running and (event == "switch" or event == "throw"):
+            wall, cpu = _clock(), _threadTime()
+            origin, target = args
+            records = self.currentRecords if origin is self.current else self._records(origin)
+            wallSlice, cpuSlice = wall - self.lastWall, cpu - self.lastCpu
+            bucket = bisect.bisect(_CALLBACK_BUCKETS, wallSlice)
+            for record in records:
+                record.wall += wallSlice
+                record.cpu += cpuSlice
+                record.sliceHistogram[bucket] += 1
+                if wallSlice > record.maxSlice:
+                    record.maxSlice = wallSlice
+            records = self._records(target)
+            for record in records:
+                record.switches += 1
+            self.current, self.currentRecords = target, records
+            self.lastWall, self.lastCpu = wall, cpu
+        if self.previousTracer is not None:
+            self.previousTracer(event, args)
+
+    def _account(self, g):
+        wall, cpu = _clock(), _threadTime()
+        for record in self._records(g):
+            record.add(wall - self.lastWall, cpu - self.lastCpu)
+        self.lastWall, self.lastCpu = wall, cpu
+
+    def _records(self, g):
+        # kept on the greenlet, as a lookup in `self.greenlets` creates a weakref.
+        profiler, records = getattr(g, "_profilerRecords", (None, None))
+        if profiler is not self:
+            if g is get_hub().greenlet:
+                group, name = None, "<hub>"
+            elif g.parent is None:
+                group, name = None, "<main>"
+            else:
+                group, name = _greenletGroups.get(g), _greenletNames.get(g)
+            if (group, name) not in self.names:
+                self.names[(group, name)] = _ProfileRecord((group, name))
+            if group not in self.groups:
+                self.groups[group] = _ProfileRecord(group)
+            # the label of a greenlet must not keep it alive.
+            label = "%s #%x" % (self._label((group, name)), id(g))
+            records = (_ProfileRecord(label), self.names[(group, name)], self.groups[group])
+            self.greenlets[g] = records
+            g._profilerRecords = (self, records)
+        return records
+
+    def _sample(self, frame):
+        # called from the sampler thread.
+        g = self.current
+        if g is None:
+            return
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append("%s (%s:%d)" % (code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        records = self.greenlets.get(g)
+        if records is not None:
+            label = self._label(records[1].label)
+        else:
+            label = self._label((_greenletGroups.get(g), _greenletNames.get(g)))
+        names.append(label)
+        self.stacks[";".join(reversed(names))] += 1
+
+    def _label(self, key):
+        group, name = key
+        return "%s/%s" % ("-" if group is None else group, "-" if name is None else name)
+
+    def top(self, n = 20, by = "name", key = "cpu"):
+        """Return the `n` greenlets, names or groups which spent the most `key`, as a
+        list of (label, stats). `by` is "greenlet", "name" or "group". Finished
+        greenlets only count in their names and groups."""
+        if by == "greenlet":
+            items = [(records[0].label, records[0].stats()) for records in list(self.greenlets.values())]
+        elif by == "name":
+            items = [(self._label(record.label), record.stats()) for record in self.names.values()]
+        elif by == "group":
+            items = [("-" if record.label is None else record.label, record.stats()) for record in self.groups.values()]
+        else:
+            raise ValueError("by must be greenlet, name or group.")
+        items.sort(key = lambda item: item[1][key], reverse = True)
+        return items[:n]
+
+    def report(self, n = 20, by = "name", key = "cpu"):
+        lines = ["%-40s %10s %10s %10s %12s" % (by, "cpu ms", "wall ms", "switches", "max slice ms")]
+        for label, stats in self.top(n, by, key):
+            lines.append("%-40s %10.1f %10.1f %10d %12.2f" % (str(label)[:40], stats["cpu"] * 1000,
+                    stats["wall"] * 1000, stats["switches"], stats["maxSlice"] * 1000))
+        return "\n".join(lines)
+
+    def dumpCollapsedStacks(self, file):
+        """Write the sampled stacks in the collapsed format of flamegraph.pl, one
+        "group/name;outer;...;inner count" line per stack. `file` is a path or a file."""
+        if not hasattr(file, "write"):
+            with open(file, "w") as f:
+                return self.dumpCollapsedStacks(f)
+        for stack, count in sorted(self.stacks.items()):
+            file.write("%s %d\n" % (stack, count))
+
+
+class QtHub(BaseHub):
+    READ = BaseHub.READ
+    WRITE = BaseHub.WRITE
+
+    # When True, `self.timers` is the only record of pending timers and one
+    # QTimer is re-armed to the earliest deadline. When False, every eventlet
+    # timer gets its own Qt timer, started by `QObject.startTimer()` of one
+    # receiver. Only change it while no timer is pending.
+    singleTimer = True
+
+    # Zero-delay timers (`sleep(0)`, `spawn()`, `Event.send()`, `scheduleCall()`)
+    # bypass the heap and go to the `ready` FIFO, which is drained in batches
+    # with one posted Qt event per batch. A batch stops after `readyBudget`
+    # seconds so that Qt can process painting and input events in between.
+    readyBudget = 0.01
+
+    # When True, file descriptors are registered with a private `select.epoll`
+    # object and only its file descriptor is watched by a QSocketNotifier, which
+    # dispatches all ready file descriptors at once. Otherwise every listener
+    # gets its own QSocketNotifier. Linux only. Only change it while there is
+    # no listener.
+    useEpoll = False
+
+    # One callback in `statsSampling` is timed for the histogram of `stats()`.
+    statsSampling = 16
+
+    # Callbacks which wake up BACKGROUND greenlets are deferred to a queue that
+    # is drained by low priority posted events, after Qt has processed the
+    # other events. Each event runs them for at most `backgroundBudget` seconds.
+    # Callbacks of INTERACTIVE greenlets run before the NORMAL ones in `ready`.
+    backgroundBudget = 0.005
+
+    def __init__(self):
+        BaseHub.__init__(self)
+        self.lclass = QtListener
+        # weakrefs of the greenlets that must exit before the application quits.
+        # A weakref keeps the hash of its greenlet after the greenlet is gone,
+        # so the weakref callback can still discard it in O(1).
+        self.greenlets = set()
+        self.timerDriver = None
+        self.timerDeadline = None
+        # Qt timer id -> eventlet timer, when `singleTimer` is False.
+        self.timerIds = {}
+        self.timerReceiver = None
+        self.ready = collections.deque()
+        self.readyInteractive = collections.deque()
+        self.readyCanceled = 0
+        # (timer, None, None) or (None, listener, fileno). the file descriptor of a
+        # deferred listener is not watched until the listener is called.
+        self.background = collections.deque()
+        self.backgroundTimers = 0
+        self.backgroundCanceled = 0
+        self.backgroundPosted = False
+        self.backgroundReceiver = None
+        self.suspendedFds = set()
+        self.readyPosted = False
+        self.readyReceiver = None
+        self.threadCalls = collections.deque()
+        self.threadCallsLock = threading.Lock()
+        self.threadCallsPosted = False
+        # created here so that it lives in the hub's thread.
+        self.threadCallsReceiver = _PostedEventReceiver(self._runThreadCalls)
+        self.epoll = None
+        self.epollNotifier = None
+        self.epollMasks = {}
+        # (evtype, fileno) -> QSocketNotifier. A notifier is enabled while its file
+        # descriptor has a listener, and dropped when the file descriptor is closed
+        # or reused. The notifiers are children of `notifierParent`, so dropping
+        # one from inside its own `activated` signal does not delete it at once.
+        self.notifiers = {}
+        self.notifierParent = None
+        self.readyPostedAt = 0.0
+        self.statsLogger = None
+        self.switchCount = 0
+        self.callbackCount = 0
+        self.callbackHistogram = [0] * (len(_CALLBACK_BUCKETS) + 1)
+        self._resetStatsWindow()
+        self.watchdog = None
+        self.heartbeat = self.clock()
+        self.heartbeatTimer = None
+        self.runningGreenlet = None
+        self.previousTracer = None
+        # `_traceSwitch()` stays in the chain of tracers if another one is set after it.
+        self.switchTraced = False
+        self.abortTimer = None
+        # the QEventLoop of a hub running in a `HubThread`. the hub of the main thread
+        # runs the application's event loop instead.
+        self.eventLoop = None
+        # the greenlets spawned by `spawnOnHub()` from other hubs.
+        self.spawnedOperations = None
+        # the GreenletGroups used in this hub, so that `abort()` can kill their greenlets.
+        self.groups = weakref.WeakSet()
+        # the default pools of this hub. their semaphores switch to the greenlets of the
+        # hub waiting on them, so hubs do not share them.
+        self.threadPool = None
+        self.processPool = None
+
+    def run(self, *args, **kwargs):
+        self.stopping = False
+        self.running = True
+        # called on the instance, as PySide6 does not take `exec()` of the class.
+        loop = self.eventLoop if self.eventLoop is not None else QCoreApplication.instance()
+        _execMethod(loop)()
+        QCoreApplication.processEvents()
+        if self.abortTimer is not None:
+            self.abortTimer.stop()
+            self.abortTimer = None
+        if self.eventLoop is not None:
+            # the thread exits, and its QTimers can not be stopped from other threads.
+            self.stopWatchdog()
+            self.stopStatsLogger()
+            if self.timerDriver is not None:
+                self.timerDriver.stop()
+            if self.threadPool is not None:
+                self.threadPool.close()
+            if self.processPool is not None:
+                self.processPool.close()
+        self.stopping = True
+        self.running = False
+
+    def abort(self, wait = False, timeout = 1.0):
+        # the greenlets of all groups are killed at once, and the application quits as
+        # soon as the last managed greenlet exits, or after `timeout` seconds.
+        self.stopping = True
+        self.schedule_call_global(0, _killAllGroups, getcurrent(), self.clock() + timeout)
+        aliveGreenlets = self._countManagedGreenlets()
+        if aliveGreenlets <= 0:
+            self._quit()
+        elif self.abortTimer is None:
+            logger.debug("Wait for %s greenlets to terminate.", aliveGreenlets)
+            self.abortTimer = QTimer()
+            self.abortTimer.setSingleShot(True)
+            self.abortTimer.timeout.connect(self._forceToQuitApplication)
+            self.abortTimer.start(_msecsUntil(timeout))
+        if wait:
+            assert self.greenlet is not greenlet.getcurrent(), \
+                    "Can't abort with wait from inside the hub's greenlet."
+            self.switch()
+
+    def add(self, evtype, fileno, cb, tb, mark_as_closed):
+        listener = BaseHub.add(self, evtype, fileno, cb, tb, mark_as_closed)
+        if self.useEpoll:
+            self._epollRegister(fileno)
+        else:
+            self._enableNotifier(evtype, fileno)
+        return listener
+
+    def remove(self, listener):
+        BaseHub.remove(self, listener)
+        if self.useEpoll:
+            self._epollRegister(listener.fileno)
+        elif listener.fileno not in self.listeners[listener.evtype]:
+            self._disableNotifier(listener.evtype, listener.fileno)
+
+    def remove_descriptor(self, fileno):
+        BaseHub.remove_descriptor(self, fileno)
+        if self.useEpoll:
+            self._epollRegister(fileno)
+        else:
+            self._dropNotifiers(fileno)
+
+    def mark_as_reopened(self, fileno):
+        BaseHub.mark_as_reopened(self, fileno)
+        self._dropNotifiers(fileno)
+        # the listeners of the old file descriptor were moved to `self.closed`, which
+        # BaseHub.run() would drain. raise IOClosed in their greenlets.
+        if self.closed:
+            self.schedule_call_global(0, self._closeListeners)
+
+    def _closeListeners(self):
+        while self.closed:
+            self.close_one()
+
+    def notify_close(self, fileno):
+        self._dropNotifiers(fileno)
+
+    def _enableNotifier(self, evtype, fileno):
+        notifier = self.notifiers.get((evtype, fileno))
+        if notifier is None:
+            if self.notifierParent is None:
+                self.notifierParent = QObject()
+            if evtype == self.READ:
+                notifier = QSocketNotifier(fileno, _READ_NOTIFIER, self.notifierParent)
+            else:
+                notifier = QSocketNotifier(fileno, _WRITE_NOTIFIER, self.notifierParent)
+            # the signal passes the file descriptor, so no closure is needed but for PySide6.
+            if not _ACTIVATED_PASSES_FILENO:
+                notifier.activated.connect(functools.partial(self._notifierActivated, evtype, fileno))
+            elif evtype == self.READ:
+                notifier.activated.connect(self._readActivated)
+            else:
+                notifier.activated.connect(self._writeActivated)
+            self.notifiers[(evtype, fileno)] = notifier
+        elif not notifier.isEnabled():
+            notifier.setEnabled(True)
+
+    def _disableNotifier(self, evtype, fileno):
+        notifier = self.notifiers.get((evtype, fileno))
+        if notifier is not None:
+            notifier.setEnabled(False)
+
+    def _dropNotifiers(self, fileno):
+        for evtype in (self.READ, self.WRITE):
+            notifier = self.notifiers.pop((evtype, fileno), None)
+            if notifier is not None:
+                notifier.setEnabled(False)
+                notifier.deleteLater()
+
+    def _readActivated(self, fileno, *args):
+        self._notifierActivated(self.READ, fileno)
+
+    def _writeActivated(self, fileno, *args):
+        self._notifierActivated(self.WRITE, fileno)
+
+    def _notifierActivated(self, evtype, fileno, *args):
+        listener = self.listeners[evtype].get(fileno)
+        if listener is None:
+            self._disableNotifier(evtype, fileno)
+        else:
+            self._dispatch(listener, fileno)
+
+    def _dispatch(self, listener, fileno):
+        if _greenletPriorities and _greenletPriorities.get(listener.greenlet, NORMAL) == BACKGROUND:
+            self._deferListener(listener, fileno)
+        else:
+            self._callListener(listener, fileno)
+
+    def _callListener(self, listener, fileno):
+        self.callbackCount += 1
+        started = self.clock() if self.callbackCount % self.statsSampling == 0 else None
+        try:
+            listener.cb(fileno)
+        except self.SYSTEM_EXCEPTIONS:
+            raise
+        except:
+            self.squelch_exception(fileno, sys.exc_info())
+            clear_sys_exc_info()
+        if started is not None:
+            self._recordDuration(self.clock() - started)
+
+    def _epollRegister(self, fileno):
+        if self.epoll is None:
+            self.epoll = select.epoll()
+            self.epollNotifier = QSocketNotifier(self.epoll.fileno(), _READ_NOTIFIER)
+            self.epollNotifier.activated.connect(self._epollActivated)
+        mask = 0
+        if fileno in self.listeners[self.READ] and (self.READ, fileno) not in self.suspendedFds:
+            mask |= select.EPOLLIN | select.EPOLLPRI | select.EPOLLERR | select.EPOLLHUP
+        if fileno in self.listeners[self.WRITE] and (self.WRITE, fileno) not in self.suspendedFds:
+            mask |= select.EPOLLOUT | select.EPOLLERR | select.EPOLLHUP
+        if mask == self.epollMasks.get(fileno, 0):
+            return
+        # the kernel forgets a closed file descriptor by itself, so our record of
+        # what is registered may be stale. fall back to the other operation.
+        if mask:
+            try:
+                if fileno in self.epollMasks:
+                    self.epoll.modify(fileno, mask)
+                else:
+                    self.epoll.register(fileno, mask)
+            except (IOError, OSError) as e:
+                if e.errno == errno.ENOENT:
+                    self.epoll.register(fileno, mask)
+                elif e.errno == errno.EEXIST:
+                    self.epoll.modify(fileno, mask)
+                else:
+                    raise
+            self.epollMasks[fileno] = mask
+        else:
+            del self.epollMasks[fileno]
+            try:
+                self.epoll.unregister(fileno)
+            except (IOError, OSError, ValueError):
+                pass
+
+    def _epollActivated(self, *args):
+        readers = self.listeners[self.READ]
+        writers = self.listeners[self.WRITE]
+        # collect the listeners before calling any of them, so that one callback
+        # can not invalidate another, as eventlet's poll hub does.
+        callbacks = []
+        for fileno, event in self.epoll.poll(0):
+            if event & (select.EPOLLIN | select.EPOLLPRI | select.EPOLLERR | select.EPOLLHUP):
+                listener = readers.get(fileno)
+                if listener is not None:
+                    callbacks.append((listener, fileno))
+            if event & (select.EPOLLOUT | select.EPOLLERR | select.EPOLLHUP):
+                listener = writers.get(fileno)
+                if listener is not None:
+                    callbacks.append((listener, fileno))
+        for listener, fileno in callbacks:
+            if self.listeners[listener.evtype].get(fileno) is listener:
+                self._dispatch(listener, fileno)
+
+    def add_timer(self, timer):
+        if _greenletPriorities:
+            # for callbacks which do not switch into a greenlet, the priority of the caller.
+            timer._priority = _greenletPriorities.get(getcurrent(), NORMAL)
+        if timer.seconds <= 0:
+            if _greenletPriorities and self._timerPriority(timer) == INTERACTIVE:
+                self.readyInteractive.append(timer)
+            else:
+                self.ready.append(timer)
+            self._postReady()
+            return self.clock()
+        scheduled_time = self.clock() + timer.seconds
+        heapq.heappush(self.timers, (scheduled_time, timer))
+        if self.singleTimer:
+            if self.timerDeadline is None or scheduled_time < self.timerDeadline:
+                self._armTimerDriver(scheduled_time)
+        else:
+            if self.timerReceiver is None:
+                self.timerReceiver = _TimerEventReceiver(self._timerIdFired)
+            timer.scheduled_time = scheduled_time
+            timer._timerId = self.timerReceiver.startTimer(_msecsUntil(timer.seconds))
+            self.timerIds[timer._timerId] = timer
+        return scheduled_time
+
+    def schedule_call_global(self, seconds, cb, *args, **kwargs):
+        timer = _Timer(seconds, cb, *args, **kwargs)
+        self.add_timer(timer)
+        return timer
+
+    def schedule_call_local(self, seconds, cb, *args, **kwargs):
+        timer = _LocalTimer(seconds, cb, *args, **kwargs)
+        self.add_timer(timer)
+        return timer
+
+    def timer_canceled(self, timer):
+        if getattr(timer, "_deferred", False):
+            self.backgroundCanceled += 1
+            return
+        if timer.seconds <= 0:
+            self.readyCanceled += 1
+            return
+        timerId = getattr(timer, "_timerId", None)
+        if timerId is not None:
+            timer._timerId = None
+            del self.timerIds[timerId]
+            self.timerReceiver.killTimer(timerId)
+        self._discardTimer()
+
+    def _timerIdFired(self, timerId):
+        # Qt timers repeat, the eventlet timer fires once.
+        self.timerReceiver.killTimer(timerId)
+        timer = self.timerIds.pop(timerId, None)
+        if timer is None:
+            return
+        timer._timerId = None
+        self._recordLag(self.clock() - timer.scheduled_time)
+        self._discardTimer()
+        if not self._deferTimer(timer):
+            self._runTimer(timer)
+
+    def _discardTimer(self):
+        # A cancelled timer, or a fired one in per-timer mode, stays in the heap
+        # until it is popped or the heap is compacted. `timers_canceled` counts
+        # those dead entries, so `get_timers_count()` stays exact.
+        self.timers_canceled += 1
+        if self.timers_canceled > 1000 and self.timers_canceled * 2 >= len(self.timers):
+            alive = [item for item in self.timers if not item[1].called]
+            self.timers_canceled -= len(self.timers) - len(alive)
+            self.timers[:] = alive
+            heapq.heapify(self.timers)
+
+    def get_timers_count(self):
+        return len(self.timers) - self.timers_canceled + len(self.ready) + len(self.readyInteractive) \
+                - self.readyCanceled + self.backgroundTimers - self.backgroundCanceled
+
+    def _postReady(self):
+        if self.readyPosted:
+            return
+        if self.readyReceiver is None:
+            self.readyReceiver = _PostedEventReceiver(self._runReady)
+        self.readyPosted = True
+        self.readyPostedAt = self.clock()
+        QCoreApplication.postEvent(self.readyReceiver, QEvent(_USER_EVENT))
+
+    def _runReady(self):
+        # callbacks queued while this batch runs belong to the next batch.
+        self.readyPosted = False
+        now = self.clock()
+        self._recordLag(now - self.readyPostedAt)
+        count = len(self.ready) + len(self.readyInteractive)
+        deadline = now + self.readyBudget
+        while count > 0 and (self.ready or self.readyInteractive):
+            count -= 1
+            if self.readyInteractive:
+                timer = self.readyInteractive.popleft()
+            else:
+                timer = self.ready.popleft()
+            if self.ready or self.readyInteractive:
+                # post the next batch now, in case this callback starts a local
+                # event loop or the budget runs out.
+                self._postReady()
+            if timer.called:
+                self.readyCanceled -= 1
+                continue
+            if not self._deferTimer(timer):
+                self._runTimer(timer)
+            if self.clock() >= deadline:
+                break
+
+    def _armTimerDriver(self, deadline):
+        if self.timerDriver is None:
+            self.timerDriver = QTimer()
+            self.timerDriver.setSingleShot(True)
+            if hasattr(self.timerDriver, "setTimerType"):
+                self.timerDriver.setTimerType(_PRECISE_TIMER)
+            self.timerDriver.timeout.connect(self._fireTimers)
+        self.timerDeadline = deadline
+        self.timerDriver.start(_msecsUntil(deadline - self.clock()))
+
+    def _fireTimers(self):
+        # `now` is taken once, so timers scheduled by the callbacks below are
+        # left to the next round and Qt gets a chance to run in between.
+        now = self.clock()
+        if self.timerDeadline is not None:
+            self._recordLag(now - self.timerDeadline)
+        self.timerDeadline = None
+        while self.singleTimer and self.timers and self.timers[0][0] <= now:
+            timer = heapq.heappop(self.timers)[1]
+            if timer.called:
+                self.timers_canceled -= 1
+            elif not self._deferTimer(timer):
+                self._runTimer(timer)
+        # a callback above may have armed the driver to its own timer, which can be
+        # later than the timers left in the heap.
+        if self.singleTimer and self.timers and (self.timerDeadline is None or self.timers[0][0] < self.timerDeadline):
+            self._armTimerDriver(self.timers[0][0])
+
+    def _timerPriority(self, timer):
+        target = getattr(timer.tpl[0], "__self__", None)
+        if isinstance(target, greenlet.greenlet):
+            # looked up when it runs, as `spawn()` schedules the greenlet before it joins a group.
+            return _greenletPriorities.get(target, NORMAL)
+        return getattr(timer, "_priority", NORMAL)
+
+    def _deferTimer(self, timer):
+        # the timer has left the heap or `ready` already and is counted as a background timer.
+        if not _greenletPriorities or self._timerPriority(timer) != BACKGROUND:
+            return False
+        timer._deferred = True
+        self.backgroundTimers += 1
+        self.background.append((timer, None, None))
+        self._postBackground()
+        return True
+
+    def _deferListener(self, listener, fileno):
+        # the file descriptor stays readable or writable, so stop watching it meanwhile.
+        self.suspendedFds.add((listener.evtype, fileno))
+        if self.useEpoll:
+            self._epollRegister(fileno)
+        else:
+            self._disableNotifier(listener.evtype, fileno)
+        self.background.append((None, listener, fileno))
+        self._postBackground()
+
+    def _resumeListener(self, listener, fileno):
+        self.suspendedFds.discard((listener.evtype, fileno))
+        current = self.listeners[listener.evtype].get(fileno) is listener
+        if self.useEpoll:
+            self._epollRegister(fileno)
+        elif current:
+            self._enableNotifier(listener.evtype, fileno)
+        if current:
+            self._callListener(listener, fileno)
+
+    def _postBackground(self):
+        if self.backgroundPosted:
+            return
+        if self.backgroundReceiver is None:
+            self.backgroundReceiver = _PostedEventReceiver(self._runBackground)
+        self.backgroundPosted = True
+        QCoreApplication.postEvent(self.backgroundReceiver, QEvent(_USER_EVENT), _LOW_EVENT_PRIORITY)
+
+    def _runBackground(self):
+        self.backgroundPosted = False
+        deadline = self.clock() + self.backgroundBudget
+        while self.background:
+            timer, listener, fileno = self.background.popleft()
+            if self.background:
+                self._postBackground()
+            if timer is None:
+                self._resumeListener(listener, fileno)
+            else:
+                timer._deferred = False
+                self.backgroundTimers -= 1
+                if timer.called:
+                    self.backgroundCanceled -= 1
+                    continue
+                self._runTimer(timer)
+            if self.clock() >= deadline:
+                break
+
+    def callFromThread(self, func, *args):
+        # Thread-safe. Calls queued before the hub gets to them share one posted event.
+        with self.threadCallsLock:
+            self.threadCalls.append((func, args))
+            if self.threadCallsPosted:
+                return
+            self.threadCallsPosted = True
+        QCoreApplication.postEvent(self.threadCallsReceiver, QEvent(_USER_EVENT))
+
+    def _runThreadCalls(self):
+        with self.threadCallsLock:
+            calls, self.threadCalls = self.threadCalls, collections.deque()
+            self.threadCallsPosted = False
+        for func, args in calls:
+            try:
+                func(*args)
+            except:
+                logger.exception("an unexpected exception occured in callFromThread().")
+                clear_sys_exc_info()
+
+    def _runTimer(self, timer):
+        self.callbackCount += 1
+        started = self.clock() if self.callbackCount % self.statsSampling == 0 else None
+        try:
+            timer()
+        except:
+            traceback.print_exc()
+            clear_sys_exc_info()
+        if started is not None:
+            self._recordDuration(self.clock() - started)
+
+    def switch(self):
+        self.switchCount += 1
+        return BaseHub.switch(self)
+
+    def stats(self):
+        """Report the health of the hub.
+
+        `loopLag` and `maxLoopLag` are how late timers and zero-delay callbacks ran,
+        and `switchRate` is the number of switches into the hub per second, all measured
+        since the previous call. `callbackHistogram` counts a sample of the callbacks
+        by how long they kept the loop busy.
+        """
+        now = self.clock()
+        elapsed = now - self.statsTime
+        stats = {
+            "loopLag": self.lagTotal / self.lagCount if self.lagCount else 0.0,
+            "maxLoopLag": self.lagMax,
+            "switches": self.switchCount,
+            "switchRate": (self.switchCount - self.statsSwitchCount) / elapsed if elapsed > 0 else 0.0,
+            "timers": self.get_timers_count(),
+            "listeners": len(self.listeners[self.READ]) + len(self.listeners[self.WRITE]),
+            "managedGreenlets": self._countManagedGreenlets(),
+            "threadPoolQueueDepth": self.threadPool.stats()["queueDepth"] if self.threadPool is not None else 0,
+            "callbacks": self.callbackCount,
+            "callbackHistogram": collections.OrderedDict(zip(_CALLBACK_BUCKET_NAMES, self.callbackHistogram)),
+        }
+        self._resetStatsWindow()
+        return stats
+
+    def startStatsLogger(self, interval = 60.0, level = logging.INFO):
+        self.stopStatsLogger()
+        self.statsLogger = QTimer()
+        self.statsLogger.timeout.connect(lambda: logger.log(level, "hub stats: %r", self.stats()))
+        self.statsLogger.start(_msecsUntil(interval))
+
+    def stopStatsLogger(self):
+        if self.statsLogger is not None:
+            self.statsLogger.stop()
+            self.statsLogger = None
+
+    def startWatchdog(self, threshold = 1.0, callback = None):
+        """Report a greenlet which blocks the event loop for more than `threshold` seconds.
+
+        `callback(greenlet, name, stack, lag)` is called from the watchdog thread, once per
+        stall. By default the stack is logged as a warning.
+        """
+        self.stopWatchdog()
+        # a QTimer beats while the loop is alive, so a busy loop costs nothing more.
+        self.heartbeat = self.clock()
+        self.heartbeatTimer = QTimer()
+        self.heartbeatTimer.timeout.connect(self._beat)
+        self.heartbeatTimer.start(_msecsUntil(threshold / 4))
+        self.runningGreenlet = getcurrent()
+        if not self.switchTraced:
+            self.previousTracer = greenlet.greenlet.settrace(self._traceSwitch)
+            self.switchTraced = True
+        self.watchdog = _Watchdog(self, threshold, callback or _reportStall)
+        self.watchdog.start()
+
+    def stopWatchdog(self):
+        if self.watchdog is None:
+            return
+        self.watchdog.stop()
+        self.watchdog = None
+        self.heartbeatTimer.stop()
+        self.heartbeatTimer = None
+        if greenlet.greenlet.gettrace() == self._traceSwitch:
+            greenlet.greenlet.settrace(self.previousTracer)
+            self.previousTracer = None
+            self.switchTraced = False
+        # otherwise a later tracer chains to this one, which passes the events on.
+        self.runningGreenlet = None
+
+    def _beat(self):
+        self.heartbeat = self.clock()
+
+    def _traceSwitch(self, event, args):
+        if self.watchdog is not None and (event == "switch" or event == "throw"):
+            self.runningGreenlet = args[1]
+        if self.previousTracer is not None:
+            self.previousTracer(event, args)
+
+    def _resetStatsWindow(self):
+        self.statsTime = self.clock()
+        self.statsSwitchCount = self.switchCount
+        self.lagTotal = 0.0
+        self.lagCount = 0
+        self.lagMax = 0.0
+
+    def _recordLag(self, lag):
+        self.lagTotal += lag
+        self.lagCount += 1
+        if lag > self.lagMax:
+            self.lagMax = lag
+
+    def _recordDuration(self, duration):
+        self.callbackHistogram[bisect.bisect(_CALLBACK_BUCKETS, duration)] += 1
+
+    def _forceToQuitApplication(self):
+        self.abortTimer = None
+        left = [ref() for ref in self.greenlets]
+        left = [g for g in left if g is not None and not g.dead]
+        if left:
+            names = collections.Counter(_greenletNames.get(g) for g in left)
+            logger.warning("%d greenlets left, by name: %r. Force hub to quit immediately.", len(left), dict(names))
+            for g in left[:10]:
+                stack = "".join(traceback.format_stack(g.gr_frame)) if g.gr_frame is not None else ""
+                logger.warning("greenlet %r (name: %r) did not exit in time:\n%s", g, _greenletNames.get(g), stack)
+        self._quit()
+
+    def _quit(self):
+        if self.eventLoop is not None:
+            self.eventLoop.quit()
+        else:
+            QCoreApplication.instance().quit()
+
+    def _addManagedGreenlets(self, greenlet):
+        assert greenlet is not None
+        greenlet.link(self._tryToQuit2)
+        self.greenlets.add(weakref.ref(greenlet, self._tryToQuit))
+
+    def _countManagedGreenlets(self):
+        return len(self.greenlets)
+
+    def _tryToQuit(self, ref):
+        self.greenlets.discard(ref)
+        if self.stopping and len(self.greenlets) == 0:
+            self._quit()
+
+    def _tryToQuit2(self, greenlet):
+        # live weakrefs compare equal when their greenlets are the same.
+        self.greenlets.discard(weakref.ref(greenlet))
+        if self.stopping and len(self.greenlets) == 0:
+            self._quit()
+
+Hub = QtHub
+
+def is_available():
+    return True
+
+use_hub(sys.modules[__name__])
+
+def start_application(quitOnLastWindowClosed = True):
+    if quitOnLastWindowClosed:
+        app = QCoreApplication.instance()
+        if hasattr(app, "lastWindowClosed"):
+            app.lastWindowClosed.connect(stop_application, _UNIQUE_CONNECTION)
+            app.setQuitOnLastWindowClosed(False)
+    get_hub().switch()
+    for hubThread in list(_hubThreads):
+        hubThread.wait()
+        _hubThreads.discard(hubThread)
+    listenerCount = len(get_hub().listeners[BaseHub.READ]) + len(get_hub().listeners[BaseHub.WRITE])
+    if listenerCount > 0:
+        logger.warning("You have %d open socket left.", listenerCount)
+    timerCount = get_hub().get_timers_count()
+    if timerCount > 0:
+        logger.warning("You have left %d timers.", timerCount)
+
+def stop_application(timeout = 1.0):
+    for hubThread in list(_hubThreads):
+        hubThread.stop(timeout)
+    get_hub().abort(timeout = timeout)
+
+
+def _killAllGroups(exclude, deadline):
+    # runs in the hub's greenlet, so every kill returns here as soon as the greenlet
+    # exits or yields, without a round trip through the event loop.
+    hub = get_hub()
+    greenlets = []
+    for group in list(hub.groups):
+        # groups may hold greenlets of the hubs in other `HubThread`s as well.
+        for name, refs in list(group.greenlets.items()):
+            mine = [ref for ref in refs if ref() is None or ref().parent is hub.greenlet]
+            for ref in mine:
+                del refs[ref]
+            if not refs:
+                del group.greenlets[name]
+            greenlets.extend(ref() for ref in mine)
+    for g in greenlets:
+        if g is None or g is exclude or g.dead:
+            continue
+        if hub.clock() > deadline:
+            break
+        try:
+            g.kill()
+        except:
+            clear_sys_exc_info()
+
+def _killall_helper(refs):
+    greenlets = [ref() for ref in refs]
+    _killGreenlets([g for g in greenlets if g is not None])
+    del refs[:]
+
+def _killGreenlets(greenlets, exc = None):
+    # throw into every greenlet first and wait afterwards, so greenlets which
+    # yield while cleaning up do that concurrently.
+    current = getcurrent()
+    waitable = current is not get_hub().greenlet
+    others = [g for g in greenlets if g is not current]
+    for g in others:
+        try:
+            if exc is None:
+                g.kill()
+            else:
+                g.kill(exc)
+        except:
+            clear_sys_exc_info()
+    if waitable:
+        for g in others:
+            if not g:
+                continue
+            try:
+                g.wait()
+            except:
+                logger.info("There are some error occured in greenlet.")
+                clear_sys_exc_info()
+    if len(others) < len(greenlets):
+        if exc is None:
+            current.kill()
+        else:
+            current.kill(exc)
+
+class _GreenletRef(weakref.ref):
+    # a weakref of a greenlet in a `GreenletGroup`, which discards itself from the group.
+    __slots__ = ("groupref", "name")
+
+    def __new__(cls, greenlet, groupref, name):
+        return weakref.ref.__new__(cls, greenlet, _discardGreenletRef)
+
+    def __init__(self, greenlet, groupref, name):
+        weakref.ref.__init__(self, greenlet, _discardGreenletRef)
+        self.groupref = groupref
+        self.name = name
+
+def _discardGreenletRef(ref):
+    group = ref.groupref()
+    if group is not None:
+        group._discard(ref.name, ref)
+
+def _discardGroupGreenlet(greenlet, ref):
+    _discardGreenletRef(ref)
+
+def _runWithSlot(slots, acquired, wrapper):
+    try:
+        slots.acquire()
+    except GreenletExit:
+        clear_sys_exc_info()
+        return
+    acquired[0] = True
+    return wrapper()
+
+def _releaseSlot(greenlet, slots, acquired):
+    if acquired[0]:
+        slots.release()
+
+def _putImapResult(greenlet, results, index):
+    # linked rather than put by the task, as a task killed before it starts never runs.
+    try:
+        outcome = greenlet.wait()
+    except GreenletExit:
+        clear_sys_exc_info()
+        outcome = None
+    if outcome is None:
+        # killed, or the object of its bound method is gone.
+        outcome = (None, None)
+    results.put((index, ) + outcome)
+
+def _spawnWithPriority(priority, func, *args):
+    # eventlet.spawn(), with the priority known before the first switch is queued, as
+    # QtHub picks the ready queue of an INTERACTIVE greenlet at that time.
+    hub = get_hub()
+    g = GreenThread(hub.greenlet)
+    if priority != NORMAL:
+        _greenletPriorities[g] = priority
+    hub.schedule_call_global(0, g.switch, func, args, {})
+    return g
+
+def _splitMethod(func):
+    # the greenlets must not keep the object of a bound method alive. Builtin and Qt
+    # methods have no `__func__`, and some objects take no weakref, keep those as they are.
+    if isinstance(func, types.MethodType) and func.__self__ is not None:
+        try:
+            return weakref.ref(func.__self__), func.__func__
+        except TypeError:
+            pass
+    return None, func
+
+class GreenletGroup:
+    def __init__(self, maxConcurrency = None, priority = NORMAL, name = None):
+        # name -> {weakref: None}, an ordered set of the live greenlets with that name.
+        self.greenlets = {}
+        # shared by the weakrefs of the greenlets.
+        self.ref = weakref.ref(self)
+        # at most `maxConcurrency` greenlets of this group run at the same time.
+        self.slots = Semaphore(maxConcurrency) if maxConcurrency else None
+        self.priority = priority
+        # reported by `GreenletProfiler`.
+        self.name = name
+
+    def __del__(self):
+        self.killall()
+
+    def __len__(self):
+        return sum(self.stats().values())
+
+    def add(self, greenlet, name = None):
+        ref = _GreenletRef(greenlet, self.ref, name)
+        refs = self.greenlets.setdefault(name, {})
+        link = getattr(greenlet, "link", None)
+        if link is None:
+            # a raw greenlet can not be linked. the finished ones with its name are pruned
+            # here instead.
+            for dead in [r for r in refs if r() is None or r().dead]:
+                del refs[dead]
+        refs[ref] = None
+        if name is not None:
+            _greenletNames[greenlet] = name
+        if self.name is not None:
+            _greenletGroups[greenlet] = self.name
+        if self.priority != NORMAL:
+            _greenletPriorities[greenlet] = self.priority
+        if link is not None:
+            link(_discardGroupGreenlet, ref)
+        hub = get_hub()
+        try:
+            hub.groups.add(self)
+            hub._addManagedGreenlets(greenlet)
+        except AttributeError:
+            pass
+
+    def _discard(self, name, ref):
+        refs = self.greenlets.get(name)
+        if refs is not None:
+            refs.pop(ref, None)
+            if not refs:
+                del self.greenlets[name]
+
+    def get(self, name):
+        for ref in self.greenlets.get(name, ()):
+            g = ref()
+            if g is not None and not g.dead:
+                return g
+        return None
+
+    def stats(self):
+        # the number of live greenlets by name. unnamed greenlets are counted under `None`.
+        stats = {}
+        for name, refs in self.greenlets.items():
+            count = 0
+            for ref in refs:
+                g = ref()
+                if g is not None and not g.dead:
+                    count += 1
+            if count:
+                stats[name] = count
+        return stats
+
+    def kill(self, name, exc = None):
+        refs = self.greenlets.pop(name, None)
+        if not refs:
+            return
+        greenlets = [ref() for ref in refs]
+        _killGreenlets([g for g in greenlets if g is not None], exc)
+
+    def killall(self):
+        if len(self.greenlets) == 0:
+            return
+        refs = [ref for refs in self.greenlets.values() for ref in refs]
+        self.greenlets.clear()
+        t = spawn(_killall_helper, refs)
+        try:
+            get_hub()._addManagedGreenlets(t)
+        except:
+            pass
+
+    def spawnWithName(self, name, func, *args, **kwargs):
+        return self._spawnWithName(name, self.priority, func, args, kwargs)
+
+    def _spawnWithName(self, name, priority, func, args, kwargs):
+        func_self = getattr(func, "__self__", None)
+        if func_self is not None:
+            q = QuitGreenletWhenNotExists()
+            func_self = weakref.proxy(func_self, q)
+            func = func.__func__
+            def wrapper_bound():
+                try:
+                    func(func_self, *args, **kwargs)
+                except (GreenletExit, ReferenceError):
+                    clear_sys_exc_info()
+                except:
+                    logger.exception("an unexpected exception occured.")
+                    clear_sys_exc_info()
+            t = self._spawnWithSlot(wrapper_bound, priority)
+            q.setGreenlet(t)
+        else:
+            def wrapper_notbound():
+                try:
+                    func(*args, **kwargs)
+                except GreenletExit:
+                    clear_sys_exc_info()
+                except:
+                    logger.exception("an unexpected exception occured.")
+                    clear_sys_exc_info()
+            t = self._spawnWithSlot(wrapper_notbound, priority)
+        self.add(t, name)
+        return t
+
+    def spawn(self, func, *args, **kwargs):
+        return self.spawnWithName(None, func, *args, **kwargs)
+
+    def spawnWithPriority(self, priority, func, *args, **kwargs):
+        t = self._spawnWithName(None, priority, func, args, kwargs)
+        if priority != NORMAL:
+            _greenletPriorities[t] = priority
+        else:
+            _greenletPriorities.pop(t, None)
+        return t
+
+    def _spawnWithSlot(self, wrapper, priority):
+        if self.slots is None:
+            return _spawnWithPriority(priority, wrapper)
+        if getcurrent() is not get_hub().greenlet:
+            # the caller waits for a free slot, which slows down greenlets spawning in a loop.
+            self.slots.acquire()
+            acquired = [True]
+            t = _spawnWithPriority(priority, wrapper)
+        else:
+            # the hub can not wait, so the new greenlet waits for the slot itself.
+            acquired = [False]
+            t = _spawnWithPriority(priority, _runWithSlot, self.slots, acquired, wrapper)
+        t.link(_releaseSlot, self.slots, acquired)
+        return t
+
+    def imapUnordered(self, func, iterable):
+        """Call `func` with every item of `iterable` in greenlets of this group, and yield
+        the results as they complete. The exception raised by `func` is raised here.
+
+        As in `spawn()`, a bound method only keeps a weak reference to its object, and the
+        greenlets are killed once the object is gone. Then the iteration ends. If a greenlet
+        is killed otherwise, `RuntimeError` is raised here.
+        """
+        ownerref, func = _splitMethod(func)
+        return (result for index, result in self._imap(ownerref, func, iterable))
+
+    def map(self, func, iterable):
+        """Like `imapUnordered()`, but wait for all items and return the results in order."""
+        ownerref, func = _splitMethod(func)
+        results = {}
+        for index, result in self._imap(ownerref, func, iterable):
+            results[index] = result
+        # fewer if the object of a bound method is gone.
+        return [results[index] for index in sorted(results)]
+
+    def _imap(self, ownerref, func, iterable):
+        results = Queue()
+        tasks = []
+        def task(index, item, owner):
+            try:
+                if owner is None:
+                    return True, func(item)
+                else:
+                    return True, func(owner, item)
+            except (GreenletExit, ReferenceError):
+                clear_sys_exc_info()
+                return None
+            except:
+                e = sys.exc_info()[1]
+                clear_sys_exc_info()
+                return False, e
+        def feed():
+            # spawning from this greenlet is slowed down by `maxConcurrency`, not the caller.
+            count = 0
+            try:
+                for index, item in enumerate(iterable):
+                    strong, owner, q = None, None, None
+                    if ownerref is not None:
+                        # hold the object until `q` knows the greenlet it kills.
+                        strong = ownerref()
+                        if strong is None:
+                            break
+                        q = QuitGreenletWhenNotExists()
+                        owner = weakref.proxy(strong, q)
+                    t = self._spawnWithSlot(functools.partial(task, index, item, owner), self.priority)
+                    t.link(_putImapResult, results, index)
+                    self.add(t, None)
+                    if q is not None:
+                        q.setGreenlet(t)
+                    del strong
+                    tasks.append(t)
+                    count += 1
+            except GreenletExit:
+                clear_sys_exc_info()
+            except:
+                results.put((count, False, sys.exc_info()[1]))
+                clear_sys_exc_info()
+                count += 1
+            finally:
+                results.put((None, None, count))
+        feeder = spawn(feed)
+        self.add(feeder, None)
+        received, total = 0, None
+        try:
+            while total is None or received < total:
+                index, ok, value = results.get()
+                if index is None:
+                    total = value
+                    continue
+                received += 1
+                if ok is None:
+                    if ownerref is not None and ownerref() is None:
+                        return
+                    raise RuntimeError("the greenlet of item %d is killed." % index)
+                if not ok:
+                    raise value
+                yield index, value
+        finally:
+            _killGreenlets([g for g in tasks + [feeder] if not g.dead])
+
+    def run(self, *allow_closure):
+        def run_impl(func):
+            func = getattr(func, "__func__", func)
+            if getattr(func, "__closure__", None):
+                for cell in func.__closure__:
+                    for v in allow_closure:
+                        if cell.cell_contents is v:
+                            break
+                    else:
+                        assert False
+            args = inspect.getargspec(func).args
+            l = sys._getframe(1).f_locals
+            v = {}
+            q = QuitGreenletWhenNotExists()
+            for arg in args:
+                v[arg] = weakref.proxy(l[arg], q)
+            def wrapper():
+                try:
+                    func(**v)
+                except (GreenletExit, ReferenceError):
+                    clear_sys_exc_info()
+                except:
+                    logger.exception("an unexpected exception occured.")
+                    clear_sys_exc_info()
+            t = self._spawnWithSlot(wrapper, self.priority)
+            self.add(t, None)
+            q.setGreenlet(t)
+        return run_impl
+
+class QuitGreenletWhenNotExists:
+    def setGreenlet(self, greenlet):
+        self.greenlet = weakref.ref(greenlet)
+
+    def __call__(self, ref):
+        g = self.greenlet()
+        if g is None:
+            return
+        try:
+            g.kill()
+        except:
+            pass
+
+def spawnInGreenlet(greenletGroupAttrName = "operations"):
+    def decoration(wrapped):
+        def wrapper(self, *args, **kwargs):
+            operations = getattr(self, greenletGroupAttrName)
+            operations.spawnWithName(wrapped.__name__, wrapped, self, *args, **kwargs)
+        functools.update_wrapper(wrapper, wrapped)
+        return wrapper
+    return decoration
+
+class DeferCallThread(threading.Thread):
+    def __init__(self, done, func, args, kwargs):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.hub = get_hub()
+        self.func = func
+        self.done = done
+        self.args = args
+        self.kwargs = kwargs
+
+    def run(self):
+        try:
+            result = self.func(*(self.args), **(self.kwargs))
+        except Exception as e:
+            logger.exception("deferToThread caught exception: %r", e)
+            self.hub.callFromThread(self.done.send_exception, e)
+        else:
+            self.hub.callFromThread(self.done.send, result)
+        finally:
+            del self.hub, self.func, self.done, self.args, self.kwargs
+
+
+class _ThreadPoolTask:
+    def __init__(self, pool, func, args, kwargs):
+        self.pool, self.func, self.args, self.kwargs = pool, func, args, kwargs
+        self.hub = get_hub()
+        self.done = Event()
+        self.submitted = _clock()
+        self.started = None
+        self.canceled = False
+
+    def send(self, result):
+        self.pool._finishTask(self)
+        self.done.send(result)
+
+    def send_exception(self, exception):
+        self.pool._finishTask(self)
+        self.done.send_exception(exception)
+
+
+class _ThreadPoolWorker(threading.Thread):
+    def __init__(self, pool):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.pool = pool
+
+    def run(self):
+        self.pool._work()
+        del self.pool
+
+
+class ThreadPool:
+    """Run blocking functions in a bounded set of persistent threads.
+
+    At most `maxWorkers` threads are started, on demand. Greenlets calling `run()` are
+    blocked cooperatively while `maxWorkers + maxQueueSize` functions are in flight.
+    If the waiting greenlet is killed, the function is skipped unless a thread has
+    picked it up already.
+    """
+    def __init__(self, maxWorkers = 8, maxQueueSize = 256):
+        self.maxWorkers = maxWorkers
+        self.maxQueueSize = maxQueueSize
+        self.slots = Semaphore(maxWorkers + maxQueueSize)
+        self.condition = threading.Condition(threading.Lock())
+        self.tasks = collections.deque()
+        self.workers = []
+        self.idleWorkers = 0
+        self.activeWorkers = 0
+        self.closed = False
+        self.completed = 0
+        self.totalWait = 0.0
+        self.totalLatency = 0.0
+        self.maxLatency = 0.0
+
+    def run(self, func, *args, **kwargs):
+        self.slots.acquire()
+        task = _ThreadPoolTask(self, func, args, kwargs)
+        with self.condition:
+            if self.closed:
+                self.slots.release()
+                raise RuntimeError("the thread pool is closed.")
+            self.tasks.append(task)
+            if len(self.tasks) > self.idleWorkers and len(self.workers) < self.maxWorkers:
+                worker = _ThreadPoolWorker(self)
+                self.workers.append(worker)
+                worker.start()
+            else:
+                self.condition.notify()
+        try:
+            return task.done.wait()
+        except:
+            task.canceled = True
+            raise
+
+    def close(self):
+        # functions already queued still run, then the threads exit.
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def stats(self):
+        with self.condition:
+            stats = {
+                "workers": len(self.workers),
+                "activeWorkers": self.activeWorkers,
+                "queueDepth": len(self.tasks),
+            }
+        stats["completed"] = self.completed
+        if self.completed:
+            stats["averageWait"] = self.totalWait / self.completed
+            stats["averageLatency"] = self.totalLatency / self.completed
+        else:
+            stats["averageWait"] = stats["averageLatency"] = 0.0
+        stats["maxLatency"] = self.maxLatency
+        return stats
+
+    def _work(self):
+        while True:
+            with self.condition:
+                self.idleWorkers += 1
+                while not self.tasks and not self.closed:
+                    self.condition.wait()
+                self.idleWorkers -= 1
+                if not self.tasks:
+                    self.workers.remove(threading.current_thread())
+                    return
+                task = self.tasks.popleft()
+                if not task.canceled:
+                    self.activeWorkers += 1
+            if task.canceled:
+                del task.func, task.args, task.kwargs
+                task.hub.callFromThread(task.send, None)
+                continue
+            task.started = _clock()
+            try:
+                result = task.func(*(task.args), **(task.kwargs))
+            except Exception as e:
+                logger.exception("deferToThread caught exception: %r", e)
+                task.hub.callFromThread(task.send_exception, e)
+            else:
+                task.hub.callFromThread(task.send, result)
+            finally:
+                del task.func, task.args, task.kwargs
+                with self.condition:
+                    self.activeWorkers -= 1
+
+    def _finishTask(self, task):
+        self.slots.release()
+        if task.started is None:
+            return
+        now = _clock()
+        latency = now - task.submitted
+        self.completed += 1
+        self.totalWait += task.started - task.submitted
+        self.totalLatency += latency
+        self.maxLatency = max(self.maxLatency, latency)
+
+def getThreadPool():
+    # the default pool of the current hub.
+    hub = get_hub()
+    pool = getattr(hub, "threadPool", None)
+    if pool is None:
+        pool = hub.threadPool = ThreadPool()
+    return pool
+
+def setThreadPool(pool):
+    hub = get_hub()
+    if getattr(hub, "threadPool", None) is not None:
+        hub.threadPool.close()
+    hub.threadPool = pool
+
+def runInNewThread(func, *args, **kwargs):
+    return getThreadPool().run(func, *args, **kwargs)
+
+class _ProcessWorker:
+    def __init__(self, context):
+        self.conn, childConn = context.Pipe()
+        self.process = context.Process(target = _process.serve, args = (childConn, ))
+        self.process.daemon = True
+        self.process.start()
+        childConn.close()
+
+    def receive(self):
+        # the hub watches the pipe, no thread polls it.
+        while not self.conn.poll():
+            trampoline(self.conn.fileno(), read = True)
+        return self.conn.recv()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, IOError):
+            pass
+        self.conn.close()
+
+
+class ProcessPool:
+    """Run CPU bound functions in a set of persistent worker processes.
+
+    At most `maxWorkers` processes are started, on demand, with the "spawn" method, as
+    forking a process with Qt and threads is not safe. So `func`, its arguments and its
+    result must be picklable. The calling greenlet blocks cooperatively on the pipe of
+    its worker. `bytes`, `bytearray` and C-contiguous numpy arrays of at least
+    `sharedMemoryThreshold` bytes are passed through shared memory instead of the pipe.
+    If the waiting greenlet is killed, the worker finishes the function first.
+    """
+    sharedMemoryThreshold = 65536
+
+    def __init__(self, maxWorkers = None):
+        self.maxWorkers = maxWorkers or multiprocessing.cpu_count()
+        self.slots = Semaphore(self.maxWorkers)
+        if hasattr(multiprocessing, "get_context"):
+            self.context = multiprocessing.get_context("spawn")
+        else:
+            self.context = multiprocessing
+        self.workers = []
+        self.idleWorkers = []
+        self.closed = False
+        self.completed = 0
+        self.totalLatency = 0.0
+        self.maxLatency = 0.0
+
+    def run(self, func, *args, **kwargs):
+        self.slots.acquire()
+        try:
+            if self.closed:
+                raise RuntimeError("the process pool is closed.")
+            if self.idleWorkers:
+                worker = self.idleWorkers.pop()
+            else:
+                worker = _ProcessWorker(self.context)
+                self.workers.append(worker)
+        except:
+            self.slots.release()
+            raise
+        started = _clock()
+        blocks = []
+        try:
+            worker.conn.send(_process.packCall(func, args, kwargs, self.sharedMemoryThreshold, blocks))
+        except:
+            self._release(worker, blocks)
+            raise
+        try:
+            ok, value, tb = worker.receive()
+        except (EOFError, OSError, IOError):
+            self._dropWorker(worker, blocks)
+            raise RuntimeError("the worker process exited unexpectedly.")
+        except:
+            # the worker is still running the function, wait for it in another greenlet.
+            spawn(self._drain, worker, blocks)
+            raise
+        names = []
+        try:
+            if not ok:
+                logger.error("runInProcess caught exception: %r\n%s", value, tb)
+                raise value
+            return _process.unpackResult(value, names)
+        finally:
+            _process.unlink(names)
+            self._release(worker, blocks)
+            latency = _clock() - started
+            self.completed += 1
+            self.totalLatency += latency
+            self.maxLatency = max(self.maxLatency, latency)
+
+    def close(self):
+        # busy workers exit after their functions return.
+        self.closed = True
+        for worker in self.idleWorkers:
+            worker.stop()
+            self.workers.remove(worker)
+        del self.idleWorkers[:]
+
+    def stats(self):
+        stats = {
+            "workers": len(self.workers),
+            "activeWorkers": len(self.workers) - len(self.idleWorkers),
+            "completed": self.completed,
+            "averageLatency": self.totalLatency / self.completed if self.completed else 0.0,
+            "maxLatency": self.maxLatency,
+        }
+        return stats
+
+    def _release(self, worker, blocks):
+        for block in blocks:
+            block.close()
+            block.unlink()
+        if self.closed:
+            worker.stop()
+            self.workers.remove(worker)
+        else:
+            self.idleWorkers.append(worker)
+        self.slots.release()
+
+    def _dropWorker(self, worker, blocks):
+        for block in blocks:
+            block.close()
+            block.unlink()
+        worker.conn.close()
+        self.workers.remove(worker)
+        self.slots.release()
+
+    def _drain(self, worker, blocks):
+        try:
+            ok, value, tb = worker.receive()
+        except (EOFError, OSError, IOError):
+            self._dropWorker(worker, blocks)
+            return
+        names = []
+        if ok and isinstance(value, _process._SharedBuffer):
+            names.append(value.name)
+        _process.unlink(names)
+        self._release(worker, blocks)
+
+def getProcessPool():
+    # the default pool of the current hub.
+    hub = get_hub()
+    pool = getattr(hub, "processPool", None)
+    if pool is None:
+        pool = hub.processPool = ProcessPool()
+    return pool
+
+def setProcessPool(pool):
+    hub = get_hub()
+    if getattr(hub, "processPool", None) is not None:
+        hub.processPool.close()
+    hub.processPool = pool
+
+def runInProcess(func, *args, **kwargs):
+    return getProcessPool().run(func, *args, **kwargs)
+
+class _IoWorker(threading.Thread):
+    # the one thread of all `GreenFile`s. Jobs run in the order they are submitted, and
+    # their results go back to the hub of their file.
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.condition = threading.Condition(threading.Lock())
+        self.jobs = collections.deque()
+
+    def submit(self, hub, func, args, callback):
+        with self.condition:
+            self.jobs.append((hub, func, args, callback))
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.jobs:
+                    self.condition.wait()
+                hub, func, args, callback = self.jobs.popleft()
+            try:
+                result, error = func(*args), None
+            except Exception as e:
+                result, error = None, e
+            hub.callFromThread(callback, result, error)
+            del hub, func, args, callback
+
+_ioWorker = None
+_ioWorkerLock = threading.Lock()
+
+def _getIoWorker():
+    global _ioWorker
+    with _ioWorkerLock:
+        if _ioWorker is None:
+            _ioWorker = _IoWorker()
+            _ioWorker.start()
+        return _ioWorker
+
+def _readInto(f, buffer, offset):
+    # FileIO releases the GIL while it reads.
+    f.seek(offset)
+    view = memoryview(buffer)
+    total = 0
+    while total < len(view):
+        n = f.readinto(view[total:])
+        if not n:
+            break
+        total += n
+    return total
+
+def _readRange(f, offset, size, scratch):
+    # pull the range into the page cache, for a memory map.
+    end = offset + size
+    while offset < end:
+        n = _readInto(f, memoryview(scratch)[:min(len(scratch), end - offset)], offset)
+        if not n:
+            break
+        offset += n
+
+def _readAt(f, offset, size):
+    f.seek(offset)
+    return f.read(size)
+
+def _writeAt(f, data, offset):
+    if offset is not None:
+        f.seek(offset)
+    view = memoryview(data)
+    while len(view):
+        view = view[f.write(view):]
+
+def _fileSize(f):
+    return os.fstat(f.fileno()).st_size
+
+class GreenFile:
+    """A binary file which is read and written in the I/O thread shared by all green files,
+    so that greenlets can stream large files while the hub keeps running.
+
+    Up to `readAhead` chunks of `chunkSize` bytes are read ahead into preallocated buffers.
+    `iterChunks()` yields memoryviews of those buffers, which are reused as the iteration
+    goes on. Writes are queued and only block the greenlet while `readAhead` chunks are
+    waiting to be written, and their errors are raised by the next call.
+
+    With `mapped = True` a read only file is also mapped into memory. The data is served
+    from the map, after the I/O thread has paged it in, and `readAt()` returns views of the
+    map without copying. They are valid until the file is closed.
+
+    A green file must be used by one greenlet at a time.
+    """
+    def __init__(self, path, mode = "rb", chunkSize = 1024 * 1024, readAhead = 4, mapped = False):
+        if "b" not in mode or "t" in mode:
+            raise ValueError("GreenFile only supports binary modes.")
+        if mapped and mode != "rb":
+            raise ValueError("a mapped GreenFile is read only.")
+        self.hub = get_hub()
+        self.worker = _getIoWorker()
+        self.chunkSize = chunkSize
+        self.readAhead = readAhead
+        self.appending = "a" in mode
+        self.file = None
+        self.file = self._call(io.open, path, mode, 0)
+        self.forReading, self.forWriting = self.file.readable(), self.file.writable()
+        self.map = None
+        self.size = None
+        self.scratch = None
+        if mapped:
+            self.size = _fileSize(self.file)
+            if self.size:
+                self.map = mmap.mmap(self.file.fileno(), 0, access = mmap.ACCESS_READ)
+            self.scratch = bytearray(chunkSize)
+        self.position = self.file.tell()
+        # (offset, length, buffer) of the chunks read ahead, in order.
+        self.chunks = collections.deque()
+        self.buffers = []
+        self.readOffset = self.position
+        self.readEnd = False
+        self.reading = 0
+        # incremented to drop the chunks which are still being read.
+        self.generation = 0
+        self.writing = 0
+        self.writeBacklog = 0
+        self.error = None
+        self.waiter = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def closed(self):
+        return self.file is None
+
+    def read(self, size = -1):
+        parts = []
+        while size != 0:
+            view = self._nextView()
+            if view is None:
+                break
+            if size > 0:
+                view = view[:size]
+                size -= len(view)
+            parts.append(view.tobytes())
+            self.position += len(view)
+        return b"".join(parts)
+
+    def readinto(self, buffer):
+        target = memoryview(buffer)
+        total = 0
+        while total < len(target):
+            view = self._nextView()
+            if view is None:
+                break
+            n = min(len(view), len(target) - total)
+            target[total:total + n] = view[:n]
+            total += n
+            self.position += n
+        return total
+
+    def iterChunks(self):
+        while True:
+            view = self._nextView()
+            if view is None:
+                return
+            self.position += len(view)
+            yield view
+
+    def readAt(self, offset, size):
+        # random access, which does not move the position nor drop the chunks read ahead.
+        self._checkOpen(self.forReading)
+        if self.map is None and self.scratch is None:
+            return self._call(_readAt, self.file, offset, size)
+        if self.map is None or offset >= self.size:
+            return memoryview(b"")
+        size = min(size, self.size - offset)
+        self._call(_readRange, self.file, offset, size, self.scratch)
+        return memoryview(self.map)[offset:offset + size]
+
+    def write(self, data):
+        self._checkOpen(self.forWriting)
+        if not isinstance(data, bytes):
+            # a copy, as the caller may reuse its buffer.
+            data = memoryview(data).tobytes()
+        while self.writeBacklog >= self.chunkSize * self.readAhead and self.error is None:
+            self._waitForChange()
+        self._raiseError()
+        self.writing += 1
+        self.writeBacklog += len(data)
+        callback = functools.partial(self._written, len(data))
+        self.worker.submit(self.hub, _writeAt, (self.file, data, None if self.appending else self.position), callback)
+        self.position += len(data)
+        # the chunks read ahead may be stale now.
+        self._dropChunks()
+        return len(data)
+
+    def flush(self):
+        self._checkOpen(True)
+        while self.writing and self.error is None:
+            self._waitForChange()
+        self._raiseError()
+
+    def seek(self, offset, whence = 0):
+        self._checkOpen(True)
+        if whence == 1:
+            offset += self.position
+        elif whence == 2:
+            self.flush()
+            offset += self.size if self.size is not None else self._call(_fileSize, self.file)
+        elif whence != 0:
+            raise ValueError("invalid whence: %r" % whence)
+        if offset < 0:
+            raise ValueError("negative seek position %r" % offset)
+        self.position = offset
+        if self.chunks and self.chunks[0][0] <= offset < self.chunks[-1][0] + self.chunks[-1][1]:
+            return offset
+        self._dropChunks()
+        return offset
+
+    def tell(self):
+        return self.position
+
+    def close(self):
+        if self.file is None:
+            return
+        f, self.file = self.file, None
+        self._dropChunks()
+        if self.map is not None:
+            try:
+                self.map.close()
+            except BufferError:
+                # the views of the map which are still alive keep it open.
+                pass
+            self.map = None
+        # the jobs of the file which are still queued run before it is closed.
+        self._call(f.close)
+        self._raiseError()
+
+    def _checkOpen(self, allowed):
+        if self.file is None:
+            raise ValueError("I/O operation on closed file.")
+        if not allowed:
+            raise io.UnsupportedOperation("the file is not opened for this operation.")
+
+    def _nextView(self):
+        # the data at the position, or None at the end of the file.
+        self._checkOpen(self.forReading)
+        if self.writing:
+            self.flush()
+        while True:
+            self._raiseError()
+            while self.chunks:
+                offset, length, buffer = self.chunks[0]
+                start = self.position - offset
+                if 0 <= start < length:
+                    if self.map is not None:
+                        return memoryview(self.map)[self.position:offset + length]
+                    return memoryview(buffer)[start:length]
+                self.chunks.popleft()
+                if buffer is not self.scratch:
+                    self.buffers.append(buffer)
+            self._readAhead()
+            if self.readEnd and not self.reading:
+                return None
+            self._waitForChange()
+
+    def _readAhead(self):
+        while not self.readEnd and len(self.chunks) + self.reading < self.readAhead:
+            if self.size is not None and self.readOffset >= self.size:
+                self.readEnd = True
+                break
+            if self.scratch is not None:
+                buffer = self.scratch
+            elif self.buffers:
+                buffer = self.buffers.pop()
+            else:
+                buffer = bytearray(self.chunkSize)
+            callback = functools.partial(self._chunkRead, self.generation, self.readOffset, buffer)
+            self.worker.submit(self.hub, _readInto, (self.file, buffer, self.readOffset), callback)
+            self.reading += 1
+            self.readOffset += self.chunkSize
+
+    def _chunkRead(self, generation, offset, buffer, length, error):
+        self.reading -= 1
+        if generation == self.generation and error is None:
+            if self.size is not None:
+                length = min(length, self.size - offset)
+            if length < self.chunkSize:
+                self.readEnd = True
+            self.chunks.append((offset, length, buffer))
+        else:
+            if buffer is not self.scratch:
+                self.buffers.append(buffer)
+            if generation == self.generation:
+                # read again from the position if the greenlet tries again.
+                self.error = self.error or error
+                self._dropChunks()
+        self._wake()
+
+    def _written(self, size, result, error):
+        self.writing -= 1
+        self.writeBacklog -= size
+        if error is not None:
+            self.error = self.error or error
+        self._wake()
+
+    def _dropChunks(self):
+        self.generation += 1
+        for offset, length, buffer in self.chunks:
+            if buffer is not self.scratch:
+                self.buffers.append(buffer)
+        self.chunks.clear()
+        self.readOffset = self.position
+        self.readEnd = False
+
+    def _raiseError(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def _call(self, func, *args):
+        done = _Event()
+        self.worker.submit(self.hub, func, args, lambda result, error: done.send((result, error)))
+        result, error = done.wait()
+        if error is not None:
+            raise error
+        return result
+
+    def _waitForChange(self):
+        self.waiter = _Event()
+        self.waiter.wait()
+
+    def _wake(self):
+        if self.waiter is not None:
+            waiter, self.waiter = self.waiter, None
+            waiter.send(None)
+
+def openFile(path, mode = "rb", chunkSize = 1024 * 1024, readAhead = 4, mapped = False):
+    return GreenFile(path, mode, chunkSize, readAhead, mapped)
+
+class ChannelClosed(RuntimeError):
+    pass
+
+class Channel:
+    """A thread-safe queue between greenlets and threads, in both directions.
+
+    Greenlets of the hub which creates the channel block cooperatively in `put()`
+    and `get()`, other threads block on a lock. `put()` blocks while `capacity`
+    items are queued, unless `capacity` is None. All greenlets waiting for the
+    channel are woken up by one call from a thread, however many items the thread
+    puts before the hub gets to them. `putMany()` and `getMany()` transfer a batch
+    of items with one lock. After `close()`, the queued items can still be taken,
+    then `get()` raises `ChannelClosed`.
+    """
+    def __init__(self, capacity = 1024):
+        self.capacity = capacity
+        self.items = collections.deque()
+        self.lock = threading.Lock()
+        self.notEmpty = threading.Condition(self.lock)
+        self.notFull = threading.Condition(self.lock)
+        self.hub = get_hub()
+        self.hubThreadId = threading.current_thread().ident
+        # the events of waiting greenlets. they are only created and sent in the hub's thread.
+        self.greenNotEmpty = None
+        self.greenNotFull = None
+        self.wakePosted = False
+        self.closed = False
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        try:
+            while True:
+                yield self.get()
+        except ChannelClosed:
+            clear_sys_exc_info()
+
+    def put(self, item):
+        self.putMany((item, ))
+
+    def putMany(self, items):
+        items = list(items)
+        green = threading.current_thread().ident == self.hubThreadId
+        while True:
+            wakeNow, event = False, None
+            with self.lock:
+                if self.closed:
+                    raise ChannelClosed("the channel is closed.")
+                room = len(items) if self.capacity is None else self.capacity - len(self.items)
+                if room > 0:
+                    self.items.extend(items[:room])
+                    del items[:room]
+                    self.notEmpty.notify_all()
+                    wakeNow = self._wakeGreenlets()
+                if items:
+                    if not green:
+                        self.notFull.wait()
+                    else:
+                        if self.greenNotFull is None:
+                            self.greenNotFull = _Event()
+                        event = self.greenNotFull
+            if wakeNow:
+                self._sendGreenEvents()
+            if not items:
+                return
+            if event is not None:
+                event.wait()
+
+    def get(self):
+        return self.getMany(1)[0]
+
+    def getMany(self, maxItems = None):
+        # wait for one item at least, and take all queued items up to `maxItems`.
+        green = threading.current_thread().ident == self.hubThreadId
+        while True:
+            wakeNow, event = False, None
+            with self.lock:
+                if self.items:
+                    count = len(self.items) if maxItems is None else min(maxItems, len(self.items))
+                    items = [self.items.popleft() for i in range(count)]
+                    self.notFull.notify_all()
+                    wakeNow = self._wakeGreenlets()
+                elif self.closed:
+                    raise ChannelClosed("the channel is closed.")
+                elif not green:
+                    self.notEmpty.wait()
+                    continue
+                else:
+                    if self.greenNotEmpty is None:
+                        self.greenNotEmpty = _Event()
+                    event = self.greenNotEmpty
+            if wakeNow:
+                self._sendGreenEvents()
+            if event is None:
+                return items
+            event.wait()
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            self.notEmpty.notify_all()
+            self.notFull.notify_all()
+            wakeNow = self._wakeGreenlets()
+        if wakeNow:
+            self._sendGreenEvents()
+
+    def _wakeGreenlets(self):
+        # called with the lock held. the woken greenlets check the channel again.
+        if self.greenNotEmpty is None and self.greenNotFull is None:
+            return False
+        if threading.current_thread().ident == self.hubThreadId:
+            return True
+        if not self.wakePosted:
+            self.wakePosted = True
+            self.hub.callFromThread(self._sendGreenEvents)
+        return False
+
+    def _sendGreenEvents(self):
+        with self.lock:
+            self.wakePosted = False
+            events = (self.greenNotEmpty, self.greenNotFull)
+            self.greenNotEmpty = self.greenNotFull = None
+        for event in events:
+            if event is not None:
+                event.send(None)
+
+class ThrottledUpdater:
+    """Apply the values pushed by greenlets to `callback` at most once per `interval` seconds.
+
+    Only the latest value is applied, or with `accumulate` the list of the values pushed
+    since the last call. A bound method of a Python object only keeps a weak reference to
+    its object, and the values are dropped once the object is gone. Builtin and Qt methods,
+    such as `label.setText`, are kept as they are.
+    """
+    def __init__(self, callback, interval = 1.0 / 60, accumulate = False):
+        self.ownerref, self.callback = _splitMethod(callback)
+        self.interval = interval
+        self.accumulate = accumulate
+        self.pending = []
+        self.timer = None
+        self.lastUpdate = 0.0
+
+    def push(self, value):
+        if self.accumulate:
+            self.pending.append(value)
+        else:
+            self.pending[:] = [value]
+        if self.timer is None:
+            hub = get_hub()
+            delay = self.lastUpdate + self.interval - hub.clock()
+            self.timer = hub.schedule_call_global(max(delay, 0), self._update)
+
+    def flush(self):
+        # apply the pending values now.
+        if self.timer is not None:
+            self.timer.cancel()
+            self._update()
+
+    def cancel(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        del self.pending[:]
+
+    def _update(self):
+        self.timer = None
+        self.lastUpdate = get_hub().clock()
+        values, self.pending = self.pending, []
+        if self.accumulate:
+            args = (values, )
+        else:
+            args = (values[-1], )
+        if self.ownerref is not None:
+            owner = self.ownerref()
+            if owner is None:
+                return
+            args = (owner, ) + args
+        try:
+            self.callback(*args)
+        except:
+            logger.exception("an unexpected exception occured in ThrottledUpdater.")
+            clear_sys_exc_info()
+
+class HubFuture:
+    """The result of a greenlet spawned by `spawnOnHub()`, which greenlets of any hub can wait for."""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.finished = False
+        self.result = None
+        self.exception = None
+        # (hub, event) of the waiting greenlets.
+        self.waiters = []
+
+    def ready(self):
+        return self.finished
+
+    def wait(self, timeout = None):
+        waiter = None
+        with self.lock:
+            if not self.finished:
+                waiter = (get_hub(), _Event())
+                self.waiters.append(waiter)
+        if waiter is not None:
+            try:
+                with Timeout(timeout):
+                    waiter[1].wait()
+            except:
+                with self.lock:
+                    if waiter in self.waiters:
+                        self.waiters.remove(waiter)
+                raise
+        if self.exception is not None:
+            raise self.exception
+        return self.result
+
+    def _set(self, result, exception):
+        # called in the thread of the greenlet.
+        with self.lock:
+            if self.finished:
+                return
+            self.finished = True
+            self.result, self.exception = result, exception
+            waiters, self.waiters = self.waiters, []
+        for hub, event in waiters:
+            hub.callFromThread(event.send, None)
+
+
+def spawnOnHub(hub, func, *args, **kwargs):
+    """Spawn a greenlet to run `func` on `hub`, which may run in another thread, and
+    return a `HubFuture` of its result."""
+    future = HubFuture()
+    hub.callFromThread(_spawnForFuture, future, func, args, kwargs)
+    return future
+
+def _spawnForFuture(future, func, args, kwargs):
+    # runs in the thread of the hub. greenlets killed before they start report by link.
+    hub = get_hub()
+    if hub.spawnedOperations is None:
+        hub.spawnedOperations = GreenletGroup()
+    t = hub.spawnedOperations.spawn(_runForFuture, future, func, args, kwargs)
+    t.link(_killedForFuture, future)
+
+def _runForFuture(future, func, args, kwargs):
+    try:
+        result = func(*args, **kwargs)
+    except SystemExceptions:
+        raise
+    except Exception as e:
+        future._set(None, e)
+        clear_sys_exc_info()
+    else:
+        future._set(result, None)
+
+def _killedForFuture(greenlet, future):
+    future._set(None, GreenletExit())
+
+
+# the `HubThread`s which are not joined yet, stopped by `stop_application()`. Qt
+# aborts if a QThread is deleted while it is running.
+_hubThreads = set()
+
+class HubThread(QThread):
+    """A QThread running a QtHub of its own, driven by a QEventLoop of the thread."""
+    def __init__(self):
+        QThread.__init__(self)
+        self.hub = None
+        self.hubStarted = threading.Event()
+        self.exited = HubFuture()
+        self.loadLock = threading.Lock()
+        self.load = 0
+
+    def start(self):
+        # the hub and its QObjects must be created in the thread, wait for them.
+        _hubThreads.add(self)
+        QThread.start(self)
+        self.hubStarted.wait()
+
+    def run(self):
+        try:
+            use_hub(sys.modules[__name__])
+            self.hub = get_hub()
+            self.hub.eventLoop = QEventLoop()
+            self.hubStarted.set()
+            self.hub.switch()
+        finally:
+            self.hubStarted.set()
+            self.exited._set(None, None)
+
+    def spawn(self, func, *args, **kwargs):
+        """Spawn a greenlet in this thread. Return a `HubFuture` of its result."""
+        with self.loadLock:
+            self.load += 1
+        return spawnOnHub(self.hub, self._runAndCount, func, args, kwargs)
+
+    def _runAndCount(self, func, args, kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self.loadLock:
+                self.load -= 1
+
+    def stop(self, timeout = 1.0):
+        # kill the greenlets of the hub, the thread exits as soon as they are gone.
+        if self.hub is not None and self.isRunning():
+            self.hub.callFromThread(self.hub.abort, False, timeout)
+
+    def join(self, timeout = None):
+        # wait for the hub to exit, without blocking the current hub. the thread
+        # returns from `run()` right after that, or Qt aborts on deleting it.
+        self.exited.wait(timeout)
+        QThread.wait(self)
+        _hubThreads.discard(self)
+
+
+class HubPool:
+    """Several `HubThread`s. `spawn()` runs greenlets on the least loaded one."""
+    def __init__(self, size = None):
+        if size is None:
+            size = max(QThread.idealThreadCount() - 1, 1)
+        self.hubThreads = [HubThread() for i in range(size)]
+        for hubThread in self.hubThreads:
+            hubThread.start()
+
+    def spawn(self, func, *args, **kwargs):
+        hubThread = min(self.hubThreads, key = lambda hubThread: hubThread.load)
+        return hubThread.spawn(func, *args, **kwargs)
+
+    def stop(self, timeout = 1.0):
+        for hubThread in self.hubThreads:
+            hubThread.stop(timeout)
+
+    def join(self, timeout = None):
+        for hubThread in self.hubThreads:
+            hubThread.join(timeout)
+
+_CALLBACK_BUCKETS = (0.0001, 0.001, 0.01, 0.1, 1.0)
+_CALLBACK_BUCKET_NAMES = ("<0.1ms", "<1ms", "<10ms", "<100ms", "<1s", ">=1s")
+
+def _msecsUntil(seconds):
+    # QTimer takes integral milliseconds. Round up, or the timer fires a bit
+    # before its deadline and has to be re-armed with a zero interval.
+    return max(int(math.ceil(seconds * 1000)), 0)
+
+def removeListItem(l, e, repeat = False):
+    if hasattr(e, "__call__"):
+        judge = e
+    else:
+        judge = lambda f: f is e
+    if not repeat:
+        for i, f in enumerate(l):
+            if judge(f):
+                l.pop(i)
+                return 1
+        else:
+            return 0
+    else:
+        i = len(l) - 1
+        count = 0
+        for f in reversed(l):
+            if judge(f):
+                l.pop(i)
+                count += 1
+        return count
+
+class Event(_Event):
+    #Provide the absent functions from threading.Event
+    def is_set(self):
+        return self.ready()
+
+    def set(self):
+        self.send(None)
+
+    def clear(self):
+        self.reset()
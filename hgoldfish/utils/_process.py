@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import absolute_import
+
+"""
+The worker processes of `hgoldfish.utils.eventlet.ProcessPool`. This module is
+imported by the workers, so it must not import Qt or eventlet.
+
+Large buffers in the arguments and the results are copied through shared memory
+instead of being pickled through the pipe. The side which creates a block sends a
+`_SharedBuffer` in place of the buffer, and the parent process unlinks every block
+once the other side has copied it out.
+"""
+import signal, traceback
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+
+class _SharedBuffer:
+    def __init__(self, name, size, kind, meta = None):
+        self.name, self.size, self.kind, self.meta = name, size, kind, meta
+
+
+def _isNdarray(value):
+    # without importing numpy, which the workers may not need.
+    t = type(value)
+    return t.__name__ == "ndarray" and t.__module__ == "numpy"
+
+
+def _share(value, threshold, blocks):
+    if shared_memory is None or threshold is None:
+        return value
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        kind, meta = "bytearray" if isinstance(value, bytearray) else "bytes", None
+    elif _isNdarray(value) and value.flags.c_contiguous:
+        kind, meta = "ndarray", (value.dtype.str, value.shape)
+    else:
+        return value
+    view = memoryview(value)
+    if view.nbytes < threshold or not view.c_contiguous:
+        return value
+    view = view.cast("B")
+    block = shared_memory.SharedMemory(create = True, size = max(view.nbytes, 1))
+    block.buf[:view.nbytes] = view
+    blocks.append(block)
+    return _SharedBuffer(block.name, view.nbytes, kind, meta)
+
+
+def _unshare(value, names):
+    if not isinstance(value, _SharedBuffer):
+        return value
+    names.append(value.name)
+    block = shared_memory.SharedMemory(name = value.name)
+    try:
+        data = block.buf[:value.size]
+        if value.kind == "bytes":
+            result = bytes(data)
+        elif value.kind == "bytearray":
+            result = bytearray(data)
+        else:
+            import numpy
+            dtype, shape = value.meta
+            result = numpy.frombuffer(data, dtype = dtype).reshape(shape).copy()
+        data.release()
+    finally:
+        block.close()
+    return result
+
+
+def packCall(func, args, kwargs, threshold, blocks):
+    args = tuple(_share(arg, threshold, blocks) for arg in args)
+    kwargs = dict((name, _share(value, threshold, blocks)) for name, value in kwargs.items())
+    return (func, args, kwargs, threshold)
+
+
+def unpackCall(message, names):
+    func, args, kwargs, threshold = message
+    args = tuple(_unshare(arg, names) for arg in args)
+    kwargs = dict((name, _unshare(value, names)) for name, value in kwargs.items())
+    return func, args, kwargs, threshold
+
+
+def packResult(result, threshold, blocks):
+    return _share(result, threshold, blocks)
+
+
+def unpackResult(result, names):
+    return _unshare(result, names)
+
+
+def unlink(names):
+    # called by the parent process only, which created or attached the blocks.
+    for name in names:
+        try:
+            block = shared_memory.SharedMemory(name = name)
+        except (OSError, ValueError):
+            continue
+        block.close()
+        block.unlink()
+
+
+def serve(conn):
+    # Ctrl+C is for the parent process, which stops the workers itself.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return
+        if message is None:
+            return
+        blocks = []
+        try:
+            func, args, kwargs, threshold = unpackCall(message, [])
+            result = func(*args, **kwargs)
+            reply = (True, packResult(result, threshold, blocks), None)
+        except Exception as e:
+            reply = (False, e, traceback.format_exc())
+        del message
+        try:
+            conn.send(reply)
+        except Exception as e:
+            # the result or the exception can not be pickled.
+            for block in blocks:
+                block.unlink()
+            conn.send((False, RuntimeError("can not send the result: %r" % e), traceback.format_exc()))
+        finally:
+            # the parent unlinks them after copying the data out.
+            for block in blocks:
+                block.close()
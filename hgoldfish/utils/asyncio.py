@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import absolute_import
+
+"""
+An asyncio event loop on the hub of `hgoldfish.utils.eventlet`, so that asyncio
+coroutines and greenlets share the Qt event loop instead of running a second
+event loop in another thread.
+
+    from hgoldfish.utils import asyncio as qasyncio
+
+    async def fetch(url):
+        ...
+        return body
+
+    def getpage(self):
+        # in a greenlet
+        body = qasyncio.awaitCoroutine(fetch("http://www.163.com/"))
+
+    async def handle():
+        page = await qasyncio.runInGreenlet(requests.get, "http://www.163.com/")
+
+The loop watches file descriptors with the listeners of the hub, QSocketNotifier
+for QtHub, and sleeps on its timers. It yields to the hub once every iteration.
+
+* `getEventLoop()`
+  The shared `QtHubEventLoop`, which runs in a greenlet of its own from the
+  first call until `stop_application()`.
+
+* `QtHubEventLoop()`
+  A `asyncio.SelectorEventLoop`. `run_forever()` and `run_until_complete()` must
+  be called in a greenlet other than the hub's.
+
+* `awaitCoroutine(coroutine, timeout = None)`
+  Run `coroutine` in the shared loop, block the current greenlet until it is
+  done, and return its result. Killing the greenlet cancels the coroutine.
+
+* `wrapGreenlet(greenthread)` & `runInGreenlet(func, *args, **kwargs)`
+  Return an asyncio future of the result of `greenthread`, or of a greenlet newly
+  spawned to run `func`. Cancelling the future kills the greenlet.
+"""
+import asyncio, selectors, functools
+from hgoldfish.utils._eventlet import GreenletGroup, SystemExceptions, Timeout, _Event, \
+        get_hub, getcurrent, spawn, clear_sys_exc_info
+
+__all__ = ["QtHubEventLoop", "getEventLoop", "awaitCoroutine", "wrapGreenlet", "runInGreenlet"]
+
+
+class _HubSelector(selectors._BaseSelectorImpl):
+    """Watch the registered file descriptors with listeners of the hub, and collect
+    their events until `select()` is called."""
+
+    def __init__(self):
+        selectors._BaseSelectorImpl.__init__(self)
+        self.hub = get_hub()
+        self.listeners = {}
+        self.ready = {}
+        self.waiter = None
+        self.woken = False
+        self.resumePending = False
+
+    def register(self, fileobj, events, data = None):
+        key = selectors._BaseSelectorImpl.register(self, fileobj, events, data)
+        self._listen(key.fd, events)
+        return key
+
+    def unregister(self, fileobj):
+        key = selectors._BaseSelectorImpl.unregister(self, fileobj)
+        self._listen(key.fd, 0)
+        self.ready.pop(key.fd, None)
+        return key
+
+    def modify(self, fileobj, events, data = None):
+        # asyncio modifies the events of a socket all the time, keep the other listener.
+        key = self.get_key(fileobj)
+        if events != key.events:
+            if not events or events & ~(selectors.EVENT_READ | selectors.EVENT_WRITE):
+                raise ValueError("Invalid events: {!r}".format(events))
+            self._listen(key.fd, events)
+            if key.fd in self.ready:
+                self.ready[key.fd] &= events
+        key = key._replace(events = events, data = data)
+        self._fd_to_key[key.fd] = key
+        return key
+
+    def close(self):
+        for fd in list(self.listeners):
+            self._listen(fd, 0)
+        self.ready.clear()
+        selectors._BaseSelectorImpl.close(self)
+
+    def _listen(self, fd, events):
+        listeners = self.listeners.setdefault(fd, {})
+        for evtype, mask in ((self.hub.READ, selectors.EVENT_READ), (self.hub.WRITE, selectors.EVENT_WRITE)):
+            listener = listeners.get(evtype)
+            if events & mask and listener is None:
+                cb = functools.partial(self._activated, mask)
+                listeners[evtype] = self.hub.add(evtype, fd, cb, self._closed, None)
+            elif not events & mask and listener is not None:
+                self.hub.remove(listeners.pop(evtype))
+        if not listeners:
+            del self.listeners[fd]
+
+    def _activated(self, mask, fd):
+        self.ready[fd] = self.ready.get(fd, 0) | mask
+        self.wakeup()
+
+    def _closed(self, exc):
+        # asyncio finds out by itself when it reads from the closed file descriptor.
+        pass
+
+    def wakeup(self):
+        self.woken = True
+        if self.waiter is not None and not self.resumePending:
+            # a timer of zero seconds runs after all socket notifiers of this iteration.
+            self.resumePending = True
+            self.hub.schedule_call_global(0, self._resume)
+
+    def _resume(self):
+        self.resumePending = False
+        waiter, self.waiter = self.waiter, None
+        if waiter is not None:
+            waiter.switch()
+
+    def select(self, timeout = None):
+        if self.ready or self.woken or (timeout is not None and timeout <= 0):
+            timeout = 0
+        self._wait(timeout)
+        ready, self.ready = self.ready, {}
+        self.woken = False
+        events = []
+        for fd, mask in ready.items():
+            key = self._key_from_fd(fd)
+            if key is not None and key.events & mask:
+                events.append((key, key.events & mask))
+        return events
+
+    def _wait(self, timeout):
+        # yield to the hub at least once, or the greenlets and Qt would starve while
+        # coroutines keep the loop busy.
+        self.waiter = getcurrent()
+        timer = self.hub.schedule_call_global(timeout, self._resume) if timeout is not None else None
+        runningLoop = asyncio._get_running_loop()
+        asyncio._set_running_loop(None)
+        try:
+            self.hub.switch()
+        finally:
+            asyncio._set_running_loop(runningLoop)
+            self.waiter = None
+            if timer is not None:
+                timer.cancel()
+
+
+class QtHubEventLoop(asyncio.SelectorEventLoop):
+    def __init__(self):
+        asyncio.SelectorEventLoop.__init__(self, _HubSelector())
+        self.greenlet = None
+
+    def run_forever(self):
+        current = getcurrent()
+        if current is get_hub().greenlet:
+            raise RuntimeError("Can't run the asyncio loop in the hub's greenlet.")
+        self.greenlet = current
+        try:
+            return asyncio.SelectorEventLoop.run_forever(self)
+        finally:
+            self.greenlet = None
+
+    def call_soon(self, callback, *args, **kwargs):
+        handle = asyncio.SelectorEventLoop.call_soon(self, callback, *args, **kwargs)
+        self._wakeup()
+        return handle
+
+    def call_at(self, when, callback, *args, **kwargs):
+        handle = asyncio.SelectorEventLoop.call_at(self, when, callback, *args, **kwargs)
+        self._wakeup()
+        return handle
+
+    def _wakeup(self):
+        # called by other greenlets while the loop is waiting in `select()`.
+        if self.greenlet is not None and getcurrent() is not self.greenlet:
+            self._selector.wakeup()
+
+
+_loop = None
+_loopGreenlet = None
+_operations = GreenletGroup()
+
+
+def _runEventLoop(loop):
+    try:
+        loop.run_forever()
+    except SystemExceptions:
+        # killed by `stop_application()`, remove the listeners of the loop.
+        loop.close()
+
+
+def getEventLoop():
+    global _loop, _loopGreenlet
+    if _loop is None or _loop.is_closed():
+        _loop = QtHubEventLoop()
+    if _loopGreenlet is None or _loopGreenlet.dead:
+        _loopGreenlet = _operations.spawnWithName("asyncio", _runEventLoop, _loop)
+    return _loop
+
+
+def awaitCoroutine(coroutine, timeout = None):
+    loop = getEventLoop()
+    if getcurrent() is loop.greenlet:
+        raise RuntimeError("awaitCoroutine() blocks the asyncio loop, await the coroutine instead.")
+    future = asyncio.ensure_future(coroutine, loop = loop)
+    done = _Event()
+    future.add_done_callback(lambda future: done.send(None))
+    try:
+        with Timeout(timeout):
+            done.wait()
+    except:
+        future.cancel()
+        raise
+    return future.result()
+
+
+def wrapGreenlet(greenthread):
+    return _futureOf(greenthread, False)
+
+
+def runInGreenlet(func, *args, **kwargs):
+    def wrapper():
+        # return the exception instead of raising it, or the hub prints it.
+        try:
+            return True, func(*args, **kwargs)
+        except Exception as e:
+            clear_sys_exc_info()
+            return False, e
+    return _futureOf(spawn(wrapper), True)
+
+
+def _futureOf(greenthread, wrapped):
+    loop = getEventLoop()
+    future = loop.create_future()
+
+    def finished(greenthread):
+        if future.done():
+            return
+        try:
+            result = greenthread.wait()
+        except SystemExceptions:
+            future.cancel()
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            if not wrapped:
+                future.set_result(result)
+            elif result[0]:
+                future.set_result(result[1])
+            else:
+                future.set_exception(result[1])
+
+    def cancelled(future):
+        if future.cancelled() and not greenthread.dead:
+            greenthread.kill()
+
+    future.add_done_callback(cancelled)
+    greenthread.link(finished)
+    return future
@@ -16,6 +16,13 @@ It is very simple to use:
     app = QApplication()
     eventlet.start_application()
 
+The Qt binding is chosen the first time this module is used: a binding whose QtCore the
+application has imported already, otherwise PyQt5, PyQt6, PySide6, PySide2 and PyQt4 are
+tried in turn. Set the `QT_API` environment variable, or call `setQtBinding(name)` before, to
+choose one. Nothing but this module is imported, and the hub is not installed, until one of
+the names of this module is used. `getQtBinding()` is the name of the chosen binding, and
+`QtCore` its QtCore module.
+
 After starting the Qt's eventloop, we can make connections as in `select`-based eventlet applications.
 
     from eventlet.green import urllib
@@ -36,14 +43,79 @@ Unfortunely, as the greenlet module is broken, we must be very careful to spawn
 This module provide this functions:
 
 * `runInNewThread(func, *args, **kwargs)`
-  Start a new thread to run `func` with arguments provided. Block current greenlet,
-  wait for the new thread to finished, and return the value `func` returned.
+  Run `func` with arguments provided in a worker thread of the default `ThreadPool`. Block
+  current greenlet, wait for the thread to finished, and return the value `func` returned.
+
+* `getThreadPool()` & `setThreadPool(pool)`
+  Get or replace the default `ThreadPool` of the current hub, as every hub has its own.
+  `ThreadPool(maxWorkers, maxQueueSize)` keeps at most `maxWorkers` threads alive.
+  Greenlets calling `run()` are blocked while `maxQueueSize` functions are waiting for
+  a thread. `stats()` reports the queue depth, active workers and task latency.
+
+* `runInProcess(func, *args, **kwargs)`
+  Run `func` in a persistent worker process of the default `ProcessPool`, for CPU bound
+  work which would hold the GIL. The current greenlet blocks until the result comes
+  back through a pipe watched by the hub. `func`, its arguments and result must be
+  picklable, and large `bytes`, `bytearray` and numpy arrays go through shared memory.
+  Workers are started with the "spawn" method, so guard the main module with
+  `if __name__ == "__main__":`.
+
+* `getProcessPool()` & `setProcessPool(pool)`
+  Get or replace the default `ProcessPool` of the current hub. `ProcessPool(maxWorkers = None)` starts at
+  most `maxWorkers` processes, the number of cores by default.
+
+* `openFile(path, mode = "rb", chunkSize = 1024 * 1024, readAhead = 4, mapped = False)`
+  Open a binary `GreenFile`, which reads and writes in one persistent I/O thread so that
+  greenlets can stream large files while the hub keeps running. It has `read()`,
+  `readinto()`, `write()`, `seek()`, `tell()`, `flush()` and `close()`. `iterChunks()`
+  yields memoryviews of the preallocated buffers read ahead, which are reused as the
+  iteration goes on. With `mapped = True` the file is served from a memory map, and
+  `readAt(offset, size)` returns views of the map for random access.
+
+* `get_hub().stats()` & `get_hub().startStatsLogger(interval = 60.0, level = logging.INFO)`
+  Report the event loop lag, greenlet switches per second, live timers, listeners, managed
+  greenlets, the `runInNewThread` queue depth and a sampled histogram of callback durations.
+  The logger writes the stats every `interval` seconds until `stopStatsLogger()`.
+
+* `get_hub().startWatchdog(threshold = 1.0, callback = None)` & `get_hub().stopWatchdog()`
+  Watch the event loop from a background thread. If a greenlet blocks it for more than
+  `threshold` seconds, its stack and `GreenletGroup` name are logged, or passed to
+  `callback(greenlet, name, stack, lag)`.
+
+* `GreenletProfiler(sampleInterval = None)`
+  `start()` and `stop()` measure the CPU time, wall time, switches and time slices of
+  every greenlet with a greenlet tracer, summed up by name and by group.
+  `report(n = 20, by = "name", key = "cpu")` formats the top `n`, `top()` returns them.
+  With `sampleInterval` seconds, a thread samples stacks, and `dumpCollapsedStacks(file)`
+  writes them for flame graphs.
+
+* `Channel(capacity = 1024)`
+  A thread-safe queue between greenlets and threads, such as QThread workers. Greenlets
+  block cooperatively in `put()` and `get()`, threads block on a lock. `putMany()` and
+  `getMany()` transfer batches, and `close()` ends the iteration of the channel.
+
+* `ThrottledUpdater(callback, interval = 1.0 / 60, accumulate = False)`
+  Greenlets `push(value)` freely, and `callback` is called at most once per `interval`
+  seconds with the latest value, or with the list of values pushed since the last call if
+  `accumulate` is True. Use it to update widgets from streaming greenlets.
+
+* `HubThread()` & `HubPool(size = None)`
+  A `HubThread` is a QThread running a hub of its own on a QEventLoop, so that network
+  heavy greenlets run off the GUI thread. `start()` it, and `spawn(func, *args, **kwargs)`
+  greenlets in it. A `HubPool` starts `size` of them, one less than the number of cores by
+  default, and spawns on the one with the fewest running greenlets. `stop(timeout = 1.0)`
+  kills their greenlets, and `join()` waits for the threads. `stop_application()` stops all.
+
+* `spawnOnHub(hub, func, *args, **kwargs)`
+  Spawn a greenlet on `hub`, which may run in another thread. Return a `HubFuture`, whose
+  `wait(timeout = None)` blocks greenlets of any hub until the result is ready.
 
 * `start_application(quitOnLastWindowClosed = True)`
   Start the Qt Application.
 
-* `stop_application()`
-  Stop the Qt Application. Wait 1 second for greenlets to stop.
+* `stop_application(timeout = 1.0)`
+  Stop the Qt Application. Kill the greenlets of all `GreenletGroup`s at once, and quit as
+  soon as they exit. Greenlets still alive after `timeout` seconds are logged with their stacks.
 
 * `exc_clear()`
   For Python 2.x version, it is `sys.exc_clear()`. For Python 3.x, it does nothing.
@@ -54,7 +126,13 @@ This module provide this functions:
 * `callMethodInEventLoop(func, *args, **kwargs)`
   Dialogs and local eventloops must run in the greenlet where Qt's main eventloop live in.
 
-The GreenletGroup manages greenlets. It has several methods you may like.
+The GreenletGroup manages greenlets. `GreenletGroup(maxConcurrency = None, priority = NORMAL,
+name = None)` runs at most `maxConcurrency` greenlets at the same time, `spawn()` blocks the
+caller until one of them exits. Greenlets of `INTERACTIVE` priority are woken up before
+`NORMAL` ones. `BACKGROUND` greenlets only run after Qt has processed painting and input
+events, for a few milliseconds at a time. `name` is used by `GreenletProfiler`. Methods
+decorated by `spawnInGreenlet()` are named after the method. It has several methods you
+may like.
 
 * `spawnWithName(name, func, *args, **kwargs)`
   Spawn a new greenlet named `name` to run the given func with past arguments.
@@ -63,434 +141,91 @@ The GreenletGroup manages greenlets. It has several methods you may like.
 * `spawn(func, *args, **kwargs)`
   Alias for `spawnWithName(None, func, *args, **kwargs)`
 
+* `spawnWithPriority(priority, func, *args, **kwargs)`
+  Like `spawn()`, but run the greenlet with `priority` instead of the priority of the group.
+
 * `get(name)`
   Get the greenlet which named `name`.
 
 * `kill(name)`
-  Kill the greenlet which named `name`
+  Kill all greenlets which named `name` at once, and wait for them to exit.
+
+* `stats()` & `len(group)`
+  The number of live greenlets by name, and in total. Finished greenlets are dropped as they exit.
+
+* `map(func, iterable)` & `imapUnordered(func, iterable)`
+  Call `func` with every item in greenlets of the group. `map()` returns the results in
+  order, `imapUnordered()` yields them as they complete.
 
 * `killall()`
   Kill all managed greenlets.
 
-"""
-import sys, logging, functools, inspect, weakref, gc, heapq, threading, traceback
-try:
-    from PyQt4.QtCore import Qt, QSocketNotifier, QTimer, \
-        QCoreApplication, QObject, pyqtSlot, QMetaObject, Q_ARG
-except ImportError:
-    from PyQt5.QtCore import Qt, QSocketNotifier, QTimer, \
-        QCoreApplication, QObject, pyqtSlot, QMetaObject, Q_ARG
-from eventlet import spawn, sleep, spawn_after, kill, Timeout, with_timeout, GreenPool, \
-        GreenPile, Queue, import_patched, connect, listen, getcurrent, monkey_patch
-from eventlet.hubs import use_hub, get_hub
-from eventlet.hubs.hub import BaseHub
-from eventlet.support import greenlets as greenlet, clear_sys_exc_info
-from eventlet.event import Event as _Event
-from eventlet.semaphore import Semaphore
-from eventlet.green import socket
-
-logger = logging.getLogger(__name__)
-
-__all__ = ["GreenletGroup", "runInNewThread", "start_application", "stop_application", \
-        "SystemExceptions", "scheduleCall", "exc_clear", "runLocalLoop", "runDialog"\
-        "callMethodInEventLoop", "spawnInGreenlet"]
-__all__ += ["sleep", "spawn", "spawn_after", "kill", "Timeout", "with_timeout", \
-        "GreenPool", "GreenPile", "Queue", "import_patched", "monkey_patch"\
-        "connect", "listen", "getcurrent", "GreenletExit", "Event", "socket", "Semaphore"] #from eventlet
-
-GreenletExit = greenlet.GreenletExit
-try:
-    ReferenceError
-except NameError:
-    ReferenceError = weakref.ReferenceError
-SystemExceptions = (GreenletExit, SystemExit, ReferenceError)
+For HTTP, `hgoldfish.utils.http` is a green client on Qt's `QNetworkAccessManager`,
+which shares keep-alive connections between greenlets and uses HTTP pipelining and
+HTTP/2. See the documentation over there.
 
-exc_clear = clear_sys_exc_info
+For asyncio, `hgoldfish.utils.asyncio` runs an asyncio event loop on the same hub,
+so that coroutines and greenlets await each other without a second thread.
 
-def scheduleCall(func, *args, **kwargs):
-    def wrapper():
-        try:
-            func(*args, **kwargs)
-        except:
-            logger.exception("an unexpected exception occured in scheduleCall().")
-    QTimer.singleShot(0, wrapper)
-
-def runLocalLoop(localLoop):
-    try:
-        f = getattr(localLoop, "exec_")
-    except AttributeError:
-        f = getattr(localLoop, "exec")
-    return callMethodInEventLoop(f)
-
-runDialog = runLocalLoop
-
-def callMethodInEventLoop(func, *args, **kwargs):
-    if not get_hub().running or getcurrent() is get_hub().greenlet:
-        return func(*args, **kwargs)
-
-    done = Event()
-    def wrapper():
-        assert getcurrent() is get_hub().greenlet
-        try:
-            result = func(*args, **kwargs)
-            done.send(result)
-        except Exception as e:
-            done.send_exception(e)
-    clear_sys_exc_info()
-    QTimer.singleShot(0, wrapper)
-    return done.wait()
-
-class QtListener:
-    def __init__(self, evtype, fileno, cb, tb = None, mark_as_closed = False):
-        self.evtype, self.fileno, self.cb = evtype, fileno, cb
-        self.tb, self.mark_as_closed = tb, mark_as_closed
-        self.notifier = QSocketNotifier(fileno, self.eventType(evtype))
-        self.notifier.activated.connect(cb)
-        self.spent = False
-
-    def __del__(self):
-        self.notifier.setEnabled(False)
-        self.notifier = None
-
-    def eventType(self, evtype):
-        assert evtype in (BaseHub.READ, BaseHub.WRITE)
-        if evtype == BaseHub.READ:
-            return QSocketNotifier.Read
-        elif evtype == BaseHub.WRITE:
-            return QSocketNotifier.Write
-
-    def defang(self):
-        self.notifier.activated.disconnected(self.cb)
-        if self.mark_as_closed is not None:
-            self.mark_as_closed()
-        self.spent = True
-
-
-class QtHub(BaseHub):
-    READ = BaseHub.READ
-    WRITE = BaseHub.WRITE
-
-    def __init__(self):
-        BaseHub.__init__(self)
-        self.lclass = QtListener
-        self.greenlets = []
-
-    def run(self, *args, **kwargs):
-        self.stopping = False
-        self.running = True
-        try:
-            getattr(QCoreApplication, "exec_")()
-        except AttributeError:
-            getattr(QCoreApplication, "exec")()
-        QCoreApplication.processEvents()
-        self.stopping = True
-        self.running = False
-
-    def abort(self, wait = False):
-        self.stopping = True
-        gc.collect()
-        aliveGreenlets = self._countManagedGreenlets()
-        if aliveGreenlets <= 0:
-            QCoreApplication.instance().quit()
-        else:
-            logger.warning("Wait for %s greenlets to terminate.", aliveGreenlets)
-            QTimer.singleShot(1000, self._forceToQuitApplication)
-        if wait:
-            assert self.greenlet is not greenlet.getcurrent(), \
-                    "Can't abort with wait from inside the hub's greenlet."
-            self.switch()
-
-    def add_timer(self, timer):
-        def done():
-            self.timer_canceled(timer)
-            try:
-                timer()
-            except:
-                traceback.print_exc()
-                clear_sys_exc_info()
-        timer._impl = QTimer()
-        timer._impl.setSingleShot(True)
-        timer._impl.timeout.connect(done)
-        timer._impl.setInterval(timer.seconds * 1000)
-        timer._impl.start()
-        scheduled_time = self.clock() + timer.seconds
-        heapq.heappush(self.timers, (scheduled_time, timer))
-        return scheduled_time
-
-    def timer_canceled(self, timer):
-        try:
-            timer._impl.stop()
-            del timer._impl
-        except AttributeError:
-            pass
+"""
+
+import sys, os, importlib
+
+_QT_BINDINGS = ("PyQt5", "PyQt6", "PySide6", "PySide2", "PyQt4")
+_qtBinding = None
+_impl = None
+
+def setQtBinding(name):
+    """Choose the Qt binding, one of PyQt4, PyQt5, PyQt6, PySide2 and PySide6."""
+    global _qtBinding
+    if _impl is not None and name != _qtBinding:
+        raise RuntimeError("the Qt binding is chosen already.")
+    _qtBinding = name
+
+def getQtBinding():
+    return _qtBinding
+
+def _importQtCore():
+    global _qtBinding
+    if _qtBinding is not None:
+        candidates = [_qtBinding]
+    elif os.environ.get("QT_API"):
+        # the values of QT_API are lower case for qtpy and matplotlib.
+        wanted = os.environ["QT_API"].lower()
+        candidates = [name for name in _QT_BINDINGS if name.lower() == wanted] or [os.environ["QT_API"]]
+    else:
+        # the binding imported by the application already, if any.
+        candidates = [name for name in _QT_BINDINGS if name + ".QtCore" in sys.modules]
+        candidates += [name for name in _QT_BINDINGS if name not in candidates]
+    for name in candidates:
         try:
-            removeListItem(self.timers, lambda item: item[1] is timer)
-            heapq.heapify(self.timers)
-        except ValueError:
-            pass
-
-    def _forceToQuitApplication(self):
-        gc.collect()
-        if self._countManagedGreenlets() > 0:
-            logger.warning("%d greenlets left. Force hub to quit immediately.", len(self.greenlets))
-        QCoreApplication.instance().quit()
-
-    def _addManagedGreenlets(self, greenlet):
-        assert greenlet is not None
-        greenlet.link(self._tryToQuit2)
-        ref = weakref.ref(greenlet, self._tryToQuit)
-        self.greenlets.append(ref)
-
-    def _countManagedGreenlets(self):
-        return len([ref for ref in self.greenlets if ref()])
-
-    def _tryToQuit(self, ref_):
-        self.greenlets = [ref for ref in self.greenlets if ref is not ref_]
-        if self.stopping and len(self.greenlets) == 0:
-            QCoreApplication.instance().quit()
-
-    def _tryToQuit2(self, greenlet):
-        self.greenlets = [ref for ref in self.greenlets if ref() is not greenlet]
-        if self.stopping and len(self.greenlets) == 0:
-            QCoreApplication.instance().quit()
-
-Hub = QtHub
-use_hub(sys.modules[__name__])
-
-def start_application(quitOnLastWindowClosed = True):
-    if quitOnLastWindowClosed:
-        app = QCoreApplication.instance()
-        if hasattr(app, "lastWindowClosed"):
-            app.lastWindowClosed.connect(stop_application, Qt.UniqueConnection)
-            app.setQuitOnLastWindowClosed(False)
-    get_hub().switch()
-    listenerCount = len(get_hub().listeners[BaseHub.READ]) + len(get_hub().listeners[BaseHub.WRITE])
-    if listenerCount > 0:
-        logger.warning("You have %d open socket left.", listenerCount)
-    if len(get_hub().timers) > 0:
-        logger.warning("You have left %d timers.", len(get_hub().timers))
-
-def stop_application():
-    get_hub().abort()
-
-
-def _killall_helper(greenlets):
-    for ref, name in greenlets:
-        greenlet = ref()
-        if greenlet is None:
+            QtCore = importlib.import_module(name + ".QtCore")
+        except ImportError:
             continue
-        try:
-            greenlet.kill()
-            if greenlet:
-                try:
-                    greenlet.wait()
-                except:
-                    logger.info("There are some error occured in greenlet.")
-                    clear_sys_exc_info()
-        except:
-            clear_sys_exc_info()
-    del greenlets[:]
-    gc.collect()
-
-class GreenletGroup:
-    def __init__(self):
-        self.greenlets = []
-
-    def __del__(self):
-        self.killall()
-
-    def add(self, greenlet, name = None):
-        ref = weakref.ref(greenlet)
-        self.greenlets.append((ref, name))
-        try:
-            get_hub()._addManagedGreenlets(greenlet)
-        except AttributeError:
-            pass
-
-    def get(self, name):
-        for ref, name_ in self.greenlets:
-            if name == name_ and ref() is not None:
-                return ref()
-        return None
-
-    def kill(self, name, exc = None):
-        l = []
-        for ref, name_ in list(self.greenlets):
-            if name_ != name:
-                l.append((ref, name_))
-            else:
-                g = ref()
-                if g is not None:
-                    try:
-                        if exc is None:
-                            g.kill()
-                        else:
-                            g.kill(exc)
-                        g.wait()
-                    except:
-                        pass
-        self.greenlets = l
-
-    def killall(self):
-        if len(self.greenlets) == 0:
-            return
-        t = spawn(_killall_helper, self.greenlets)
-        try:
-            get_hub()._addManagedGreenlets(t)
-        except:
-            pass
-
-    def spawnWithName(self, name, func, *args, **kwargs):
-        func_self = getattr(func, "__self__", None)
-        if func_self is not None:
-            q = QuitGreenletWhenNotExists()
-            func_self = weakref.proxy(func_self, q)
-            func = func.__func__
-            def wrapper_bound():
-                try:
-                    func(func_self, *args, **kwargs)
-                except (GreenletExit, ReferenceError):
-                    clear_sys_exc_info()
-                except:
-                    logger.exception("an unexpected exception occured.")
-                    clear_sys_exc_info()
-            t = spawn(wrapper_bound)
-            q.setGreenlet(t)
-        else:
-            def wrapper_notbound():
-                try:
-                    func(*args, **kwargs)
-                except GreenletExit:
-                    clear_sys_exc_info()
-                except:
-                    logger.exception("an unexpected exception occured.")
-                    clear_sys_exc_info()
-            t = spawn(wrapper_notbound)
-        self.add(t, name)
-        return t
-
-    def spawn(self, func, *args, **kwargs):
-        return self.spawnWithName(None, func, *args, **kwargs)
-
-    def run(self, *allow_closure):
-        def run_impl(func):
-            func = getattr(func, "__func__", func)
-            if getattr(func, "__closure__", None):
-                for cell in func.__closure__:
-                    for v in allow_closure:
-                        if cell.cell_contents is v:
-                            break
-                    else:
-                        assert False
-            args = inspect.getargspec(func).args
-            l = sys._getframe(1).f_locals
-            v = {}
-            q = QuitGreenletWhenNotExists()
-            for arg in args:
-                v[arg] = weakref.proxy(l[arg], q)
-            def wrapper():
-                try:
-                    func(**v)
-                except (GreenletExit, ReferenceError):
-                    clear_sys_exc_info()
-                except:
-                    logger.exception("an unexpected exception occured.")
-                    clear_sys_exc_info()
-            t = spawn(wrapper)
-            self.add(t, None)
-            q.setGreenlet(t)
-        return run_impl
-
-class QuitGreenletWhenNotExists:
-    def setGreenlet(self, greenlet):
-        self.greenlet = weakref.ref(greenlet)
-
-    def __call__(self, ref):
-        g = self.greenlet()
-        if g is None:
-            return
-        try:
-            g.kill()
-        except:
-            pass
-
-def spawnInGreenlet(greenletGroupAttrName = "operations"):
-    def decoration(wrapped):
-        def wrapper(self, *args, **kwargs):
-            operations = getattr(self, greenletGroupAttrName)
-            operations.spawn(wrapped, self, *args, **kwargs)
-        functools.update_wrapper(wrapper, wrapped)
-        return wrapper
-    return decoration
-
-class _DeferCallMainThreadStub(QObject):
-    @pyqtSlot("PyQt_PyObject", "PyQt_PyObject")
-    def _slot_callback(self, done, result):
-        done.send(result)
-
-    @pyqtSlot("PyQt_PyObject", "PyQt_PyObject")
-    def _slot_errback(self, done, exception):
-        done.send_exception(exception)
-
-class DeferCallThread(threading.Thread):
-    mainThreadStub = _DeferCallMainThreadStub()
-
-    def __init__(self, done, func, args, kwargs):
-        threading.Thread.__init__(self)
-        self.daemon = True
-        self.func = func
-        self.done = done
-        self.args = args
-        self.kwargs = kwargs
-
-    def run(self):
-        try:
-            result = self.func(*(self.args), **(self.kwargs))
-        except Exception as e:
-            logger.exception("deferToThread caught exception: %r", e)
-            QMetaObject.invokeMethod(DeferCallThread.mainThreadStub, "_slot_errback", Qt.QueuedConnection,
-                    Q_ARG("PyQt_PyObject", self.done), Q_ARG("PyQt_PyObject", e))
-        else:
-            QMetaObject.invokeMethod(DeferCallThread.mainThreadStub, "_slot_callback", Qt.QueuedConnection,
-                    Q_ARG("PyQt_PyObject", self.done), Q_ARG("PyQt_PyObject", result))
-        finally:
-            del self.func, self.done, self.args, self.kwargs
-
-
-def runInNewThread(func, *args, **kwargs):
-    done = Event()
-    t = DeferCallThread(done, func, args, kwargs)
-    t.start()
-    return done.wait()
-
-def removeListItem(l, e, repeat = False):
-    if hasattr(e, "__call__"):
-        judge = e
-    else:
-        judge = lambda f: f is e
-    if not repeat:
-        for i, f in enumerate(l):
-            if judge(f):
-                l.pop(i)
-                return 1
-        else:
-            return 0
-    else:
-        i = len(l) - 1
-        count = 0
-        for f in reversed(l):
-            if judge(f):
-                l.pop(i)
-                count += 1
-        return count
-
-class Event(_Event):
-    #Provide the absent functions from threading.Event
-    def is_set(self):
-        return self.ready()
-
-    def set(self):
-        self.send(None)
-
-    def clear(self):
-        self.reset()
+        _qtBinding = name
+        return QtCore
+    raise ImportError("no Qt binding is found in %s." % ", ".join(candidates))
+
+def _load():
+    global _impl
+    if _impl is None:
+        from hgoldfish.utils import _eventlet
+        _impl = _eventlet
+    return _impl
+
+def __getattr__(name):
+    if name.startswith("__") and name != "__all__":
+        raise AttributeError(name)
+    value = getattr(_load(), name)
+    # the public names never change, so they are looked up only once.
+    if name in _impl.__all__:
+        globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(dir(_load())))
+
+if sys.version_info < (3, 7):
+    # module level __getattr__() is not supported.
+    _load()
+    from hgoldfish.utils._eventlet import *
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import division
+from __future__ import absolute_import
+
+"""
+A green HTTP client on Qt's QNetworkAccessManager.
+
+    from hgoldfish.utils import http
+    response = http.get("http://www.163.com/")
+    print(response.statusCode, response.text())
+
+Greenlets block cooperatively until the reply arrives. Qt keeps the connections
+alive and shares them between greenlets, up to six per host, and uses HTTP
+pipelining and HTTP/2 where the server allows.
+
+* `HttpSession(timeout = None, http2 = True, pipelining = True)`
+  Owns a QNetworkAccessManager. `request(method, url, data = None, json = None,
+  headers = None, stream = False, timeout = None)` returns a `HttpResponse` when the
+  headers arrive. Unless `stream` is True, the body is read as well. `get()`, `post()`,
+  `put()`, `delete()` and `head()` are short cuts.
+
+* `get(url, **kwargs)`, `post(url, data = None, **kwargs)` & `request(method, url, **kwargs)`
+  Use a session shared by all greenlets.
+
+* `HttpResponse`
+  `statusCode`, `reason`, `url` and `headers`, a dict with lower case names. `read(size)`,
+  `iterChunks(chunkSize)`, `content()`, `text(encoding = None)` and `json()` read the body.
+  `close()` aborts a streaming response that is not read to the end.
+
+A request which fails without a HTTP status raises `HttpError`.
+"""
+import json as _json, importlib
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
+from hgoldfish.utils._eventlet import QtCore, _enum, _Event, Timeout
+
+QtNetwork = importlib.import_module(QtCore.__name__.rsplit(".", 1)[0] + ".QtNetwork")
+QNetworkAccessManager, QNetworkRequest, QNetworkReply = QtNetwork.QNetworkAccessManager, \
+        QtNetwork.QNetworkRequest, QtNetwork.QNetworkReply
+
+_STATUS_CODE = _enum(QNetworkRequest, "Attribute", "HttpStatusCodeAttribute")
+_REASON_PHRASE = _enum(QNetworkRequest, "Attribute", "HttpReasonPhraseAttribute")
+_HTTP2_ALLOWED = _enum(QNetworkRequest, "Attribute", "Http2AllowedAttribute")
+_PIPELINING_ALLOWED = _enum(QNetworkRequest, "Attribute", "HttpPipeliningAllowedAttribute")
+_REDIRECT_POLICY = _enum(QNetworkRequest, "Attribute", "RedirectPolicyAttribute")
+_NO_LESS_SAFE_REDIRECT = _enum(QNetworkRequest, "RedirectPolicy", "NoLessSafeRedirectPolicy")
+_NO_ERROR = _enum(QNetworkReply, "NetworkError", "NoError")
+
+__all__ = ["HttpError", "HttpResponse", "HttpSession", "request", "get", "post"]
+
+
+class HttpError(IOError):
+    pass
+
+
+def _toBytes(data):
+    # PyQt returns bytes, PySide returns QByteArray. `bytes()` of a QByteArray crashes some
+    # builds of PySide2, `data()` does not.
+    return data.data() if not isinstance(data, bytes) else data
+
+
+class HttpResponse:
+    def __init__(self, reply):
+        self.reply = reply
+        self.changed = None
+        self.buffer = []
+        # how much of the buffered body `read()` has returned, once the reply is closed.
+        self.position = 0
+        reply.readyRead.connect(self._wake)
+        reply.finished.connect(self._wake)
+        reply.metaDataChanged.connect(self._wake)
+        self.statusCode = None
+        self.reason = ""
+        self.url = reply.url().toString()
+        self.headers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def _wake(self, *args):
+        if self.changed is not None and not self.changed.ready():
+            self.changed.send(None)
+
+    def _wait(self):
+        # until the reply emits any signal.
+        self.changed = _Event()
+        try:
+            self.changed.wait()
+        finally:
+            self.changed = None
+
+    def _waitForHeaders(self):
+        while self.reply.attribute(_STATUS_CODE) is None and not self.reply.isFinished():
+            self._wait()
+        statusCode = self.reply.attribute(_STATUS_CODE)
+        if statusCode is None:
+            if self.reply.error() != _NO_ERROR:
+                raise HttpError(self.reply.errorString())
+            raise HttpError("the reply has no HTTP status.")
+        self.statusCode = int(statusCode)
+        reason = self.reply.attribute(_REASON_PHRASE)
+        self.reason = _toBytes(reason).decode("latin-1") if not isinstance(reason, type("")) else reason
+        self.url = self.reply.url().toString()
+        self.headers = {}
+        for name, value in self.reply.rawHeaderPairs():
+            self.headers[_toBytes(name).decode("latin-1").lower()] = _toBytes(value).decode("latin-1")
+
+    def read(self, size = -1):
+        """Read at most `size` bytes, or to the end. Return b"" at the end of the body."""
+        if size < 0 or self.reply is None:
+            # the body is buffered by `content()`, which a request without `stream` calls.
+            body = self.content()
+            end = len(body) if size < 0 else self.position + size
+            chunk = body[self.position:end]
+            self.position += len(chunk)
+            return chunk
+        while True:
+            if self.reply.bytesAvailable() > 0:
+                return _toBytes(self.reply.read(size))
+            if self.reply.isFinished():
+                return b""
+            self._wait()
+
+    def iterChunks(self, chunkSize = 65536):
+        while True:
+            chunk = self.read(chunkSize)
+            if not chunk:
+                return
+            yield chunk
+
+    def content(self):
+        if self.reply is not None:
+            while not self.reply.isFinished():
+                self._wait()
+            self.buffer.append(_toBytes(self.reply.readAll()))
+            self.buffer = [b"".join(self.buffer)]
+            self.close()
+        return self.buffer[0] if self.buffer else b""
+
+    def text(self, encoding = None):
+        if encoding is None:
+            contentType = self.headers.get("content-type", "")
+            encoding = "utf-8"
+            for param in contentType.split(";")[1:]:
+                name, _, value = param.strip().partition("=")
+                if name.lower() == "charset" and value:
+                    encoding = value.strip("\"'")
+        return self.content().decode(encoding, "replace")
+
+    def json(self):
+        return _json.loads(self.text())
+
+    def close(self):
+        reply, self.reply = self.reply, None
+        if reply is None:
+            return
+        if not reply.isFinished():
+            reply.abort()
+        reply.deleteLater()
+
+
+class HttpSession:
+    def __init__(self, timeout = None, http2 = True, pipelining = True):
+        self.manager = QNetworkAccessManager()
+        self.timeout = timeout
+        self.http2 = http2
+        self.pipelining = pipelining
+
+    def request(self, method, url, data = None, json = None, headers = None, stream = False, timeout = None):
+        request = QNetworkRequest(QtCore.QUrl(url))
+        if self.http2 and _HTTP2_ALLOWED is not None:
+            request.setAttribute(_HTTP2_ALLOWED, True)
+        if self.pipelining and _PIPELINING_ALLOWED is not None:
+            request.setAttribute(_PIPELINING_ALLOWED, True)
+        if _REDIRECT_POLICY is not None:
+            request.setAttribute(_REDIRECT_POLICY, _NO_LESS_SAFE_REDIRECT)
+        headers = dict(headers or {})
+        if json is not None:
+            data = _json.dumps(json).encode("utf-8")
+            headers.setdefault("Content-Type", "application/json")
+        elif isinstance(data, dict):
+            data = urlencode(data).encode("ascii")
+            headers.setdefault("Content-Type", "application/x-www-form-urlencoded")
+        elif isinstance(data, type("")):
+            data = data.encode("utf-8")
+        for name, value in headers.items():
+            request.setRawHeader(name.encode("latin-1"), value.encode("latin-1"))
+        reply = self._send(method.upper(), request, data)
+        response = HttpResponse(reply)
+        if timeout is None:
+            timeout = self.timeout
+        try:
+            with Timeout(timeout, HttpError("the request is timed out.")):
+                response._waitForHeaders()
+                if not stream:
+                    response.content()
+        except:
+            # the reply is aborted if the greenlet is killed as well.
+            response.close()
+            raise
+        return response
+
+    def _send(self, method, request, data):
+        # Qt waits for the body of a custom verb, even the one announced in reply to HEAD.
+        if method == "HEAD":
+            return self.manager.head(request)
+        elif method == "GET" and data is None:
+            return self.manager.get(request)
+        elif method == "POST":
+            return self.manager.post(request, data if data is not None else b"")
+        elif method == "PUT":
+            return self.manager.put(request, data if data is not None else b"")
+        elif method == "DELETE" and data is None:
+            return self.manager.deleteResource(request)
+        elif data is None:
+            return self.manager.sendCustomRequest(request, method.encode("ascii"))
+        else:
+            return self.manager.sendCustomRequest(request, method.encode("ascii"), data)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request("HEAD", url, **kwargs)
+
+    def post(self, url, data = None, **kwargs):
+        return self.request("POST", url, data = data, **kwargs)
+
+    def put(self, url, data = None, **kwargs):
+        return self.request("PUT", url, data = data, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+
+_session = None
+
+def _getSession():
+    global _session
+    if _session is None:
+        _session = HttpSession()
+    return _session
+
+def request(method, url, **kwargs):
+    return _getSession().request(method, url, **kwargs)
+
+def get(url, **kwargs):
+    return _getSession().get(url, **kwargs)
+
+def post(url, data = None, **kwargs):
+    return _getSession().post(url, data = data, **kwargs)
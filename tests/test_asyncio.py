@@ -0,0 +1,37 @@
+from __future__ import print_function
+from __future__ import division
+
+# asyncio and its syntax need Python 3, unlike the rest of the tests.
+import asyncio, unittest
+from hgoldfish.utils import asyncio as qasyncio
+from tests.test_eventlet import eventlet, runInHub
+
+
+class AsyncioTest(unittest.TestCase):
+    def test_stream_round_trip(self):
+        def serve(server):
+            conn, address = server.accept()
+            conn.sendall(conn.recv(1024).upper())
+            conn.close()
+
+        async def talk(port):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"hello")
+            data = await reader.read(1024)
+            writer.close()
+            # and back to a greenlet from the coroutine.
+            doubled = await qasyncio.runInGreenlet(lambda: eventlet.sleep(0.01) or data * 2)
+            return data, doubled
+
+        def main():
+            server = eventlet.listen(("127.0.0.1", 0))
+            eventlet.spawn(serve, server)
+            try:
+                return qasyncio.awaitCoroutine(talk(server.getsockname()[1]), timeout = 5)
+            finally:
+                server.close()
+        self.assertEqual(runInHub(main), (b"HELLO", b"HELLOHELLO"))
+
+
+if __name__ == "__main__":
+    unittest.main()
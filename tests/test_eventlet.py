@@ -0,0 +1,547 @@
+from __future__ import print_function
+from __future__ import division
+
+import sys, os, time, math, unittest, subprocess
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from hgoldfish.utils import eventlet
+
+# run the tests under another binding with `QT_API`, as in `QT_API=pyside6 python -m pytest tests`.
+try:
+    eventlet.QtCore
+except ImportError as e:
+    raise unittest.SkipTest(str(e))
+
+_app = None
+
+
+def ensureApplication():
+    global _app
+    if _app is None:
+        _app = eventlet.QtCore.QCoreApplication.instance() or eventlet.QtCore.QCoreApplication([])
+
+
+def runInHub(func, *args):
+    # run `func` in a greenlet of the application's event loop, and return its result.
+    ensureApplication()
+    outcome = []
+
+    def wrapper():
+        try:
+            outcome.append((True, func(*args)))
+        except Exception as e:
+            outcome.append((False, e))
+        finally:
+            eventlet.stop_application()
+    eventlet.spawn(wrapper)
+    eventlet.start_application()
+    ok, value = outcome[0]
+    if not ok:
+        raise value
+    return value
+
+
+class BindingTest(unittest.TestCase):
+    def test_binding_imported_by_application(self):
+        # another binding may be installed, but the hub must run on the QCoreApplication
+        # of the application.
+        for name in eventlet._QT_BINDINGS:
+            code = "import %s.QtCore; from hgoldfish.utils import eventlet; print(eventlet.QtCore.__name__)" % name
+            env = dict(os.environ)
+            env.pop("QT_API", None)
+            try:
+                output = subprocess.check_output([sys.executable, "-c", code], env = env, stderr = subprocess.STDOUT)
+            except subprocess.CalledProcessError:
+                # not installed.
+                continue
+            self.assertEqual(output.decode("ascii").strip(), name + ".QtCore")
+
+
+class ReadyQueueTest(unittest.TestCase):
+    def test_zero_delay_callbacks_run_in_order(self):
+        def main():
+            order = []
+            hub = eventlet.get_hub()
+            for i in range(100):
+                hub.schedule_call_global(0, order.append, i)
+            eventlet.sleep(0)
+            eventlet.sleep(0.01)
+            return order
+        self.assertEqual(runInHub(main), list(range(100)))
+
+    def test_sleep_zero_takes_turns(self):
+        def main():
+            order = []
+
+            def loop(name):
+                for i in range(3):
+                    order.append(name)
+                    eventlet.sleep(0)
+            threads = [eventlet.spawn(loop, name) for name in "ab"]
+            for t in threads:
+                t.wait()
+            return "".join(order)
+        self.assertEqual(runInHub(main), "ababab")
+
+
+class TimerTest(unittest.TestCase):
+    def test_later_timer_does_not_delay_earlier_one(self):
+        # a callback of the single QTimer schedules a timer later than those in the heap.
+        def other():
+            eventlet.sleep(0.01)
+            eventlet.sleep(1.0)
+
+        def main():
+            g = eventlet.spawn(other)
+            started = time.time()
+            eventlet.sleep(0.05)
+            elapsed = time.time() - started
+            g.kill()
+            return elapsed
+        self.assertLess(runInHub(main), 0.5)
+
+
+class StopApplicationTest(unittest.TestCase):
+    def test_quit_once_groups_exit(self):
+        ensureApplication()
+        group = eventlet.GreenletGroup()
+        group.spawn(eventlet.sleep, 10)
+        eventlet.spawn_after(0.05, eventlet.stop_application, 5.0)
+        started = time.time()
+        eventlet.start_application()
+        self.assertLess(time.time() - started, 1.0)
+        self.assertEqual(len(group), 0)
+
+    def test_quit_after_timeout(self):
+        ensureApplication()
+        released = [False]
+
+        def stubborn():
+            try:
+                eventlet.sleep(10)
+            except eventlet.GreenletExit:
+                while not released[0]:
+                    eventlet.sleep(0.01)
+        group = eventlet.GreenletGroup()
+        group.spawn(stubborn)
+        eventlet.spawn_after(0.05, eventlet.stop_application, 0.3)
+        started = time.time()
+        eventlet.start_application()
+        elapsed = time.time() - started
+        # let it finish, so it does not delay the next test.
+        released[0] = True
+        runInHub(eventlet.sleep, 0.05)
+        self.assertGreater(elapsed, 0.3)
+        self.assertLess(elapsed, 2.0)
+
+
+class WatchdogTest(unittest.TestCase):
+    def test_stop_keeps_later_tracer(self):
+        import greenlet
+
+        def main():
+            hub = eventlet.get_hub()
+            hub.startWatchdog(10.0)
+            profiler = eventlet.GreenletProfiler()
+            profiler.start()
+            hub.stopWatchdog()
+            group = eventlet.GreenletGroup()
+            group.spawnWithName("worker", eventlet.sleep, 0).wait()
+            profiler.stop()
+            names = dict(profiler.top(by = "name"))
+            # started again while it is in the chain still.
+            hub.startWatchdog(10.0)
+            eventlet.sleep(0)
+            hub.stopWatchdog()
+            return names["-/worker"]["switches"], greenlet.gettrace()
+        switches, tracer = runInHub(main)
+        self.assertGreater(switches, 0)
+        self.assertIsNone(tracer)
+
+
+class ListenerTest(unittest.TestCase):
+    def test_reused_file_descriptor_raises_in_old_reader(self):
+        from eventlet.green import socket
+        from eventlet.hubs import IOClosed
+
+        def reader(sock):
+            # eventlet turns the IOClosed of the listener into EOFError for recv().
+            try:
+                sock.recv(1)
+            except (IOClosed, EOFError):
+                return "closed"
+            return "read"
+
+        def main():
+            a, b = socket.socketpair()
+            fileno = a.fileno()
+            g = eventlet.spawn(reader, a)
+            eventlet.sleep(0.01)
+            # closed behind the back of the green socket, and the fd is reused at once.
+            os.close(fileno)
+            c = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            try:
+                self.assertEqual(c.fileno(), fileno)
+                with eventlet.Timeout(1.0):
+                    return g.wait()
+            finally:
+                # the old socket must not close the fd which `c` owns now.
+                a.fd.detach()
+                c.close()
+                b.close()
+        self.assertEqual(runInHub(main), "closed")
+
+
+class GreenletGroupTest(unittest.TestCase):
+    def test_map_with_builtin_function(self):
+        def main():
+            group = eventlet.GreenletGroup(maxConcurrency = 2)
+            results = group.map(len, ["a", "bb", "ccc"])
+            roots = sorted(group.imapUnordered(math.sqrt, [1, 4, 9]))
+            return results, roots
+        self.assertEqual(runInHub(main), ([1, 2, 3], [1.0, 2.0, 3.0]))
+
+    def test_map_with_method_of_object_without_weakref(self):
+        class Scale(object):
+            __slots__ = ("factor", )
+
+            def __init__(self, factor):
+                self.factor = factor
+
+            def apply(self, value):
+                return value * self.factor
+
+        def main():
+            return eventlet.GreenletGroup().map(Scale(3).apply, [1, 2])
+        self.assertEqual(runInHub(main), [3, 6])
+
+    def test_map_with_killed_task(self):
+        def work(item):
+            if item == 1:
+                raise eventlet.GreenletExit()
+            return item
+
+        def main():
+            try:
+                eventlet.GreenletGroup().map(work, range(3))
+            except RuntimeError:
+                return True
+            return False
+        self.assertTrue(runInHub(main))
+
+    def test_imap_ends_when_object_is_gone(self):
+        import gc
+
+        class Worker(object):
+            def work(self, item):
+                if item > 0:
+                    eventlet.sleep(0.1)
+                return item
+
+        def main():
+            owner = [Worker()]
+            results = []
+            for result in eventlet.GreenletGroup().imapUnordered(owner[0].work, range(3)):
+                results.append(result)
+                del owner[:]
+                gc.collect()
+            return results
+        self.assertEqual(runInHub(main), [0])
+
+    def test_add_raw_greenlet(self):
+        import greenlet
+
+        def main():
+            group = eventlet.GreenletGroup()
+            first = greenlet.greenlet(lambda: None)
+            group.add(first, "raw")
+            first.switch()
+            second = greenlet.greenlet(lambda: None)
+            group.add(second, "raw")
+            return group.get("raw") is second, len(group.greenlets["raw"])
+        self.assertEqual(runInHub(main), (True, 1))
+
+    def test_interactive_greenlet_runs_first(self):
+        def main():
+            order = []
+
+            def record(name):
+                order.append(name)
+            groups = [eventlet.GreenletGroup(priority = priority) for priority in
+                    (eventlet.NORMAL, eventlet.INTERACTIVE, eventlet.BACKGROUND)]
+            for group, name in zip(groups, "nib"):
+                group.spawn(record, name)
+            eventlet.GreenletGroup().spawnWithPriority(eventlet.INTERACTIVE, record, "I")
+            eventlet.sleep(0.05)
+            return "".join(order)
+        self.assertEqual(runInHub(main), "iInb")
+
+
+class ThreadPoolTest(unittest.TestCase):
+    def test_backpressure(self):
+        import threading
+
+        def main():
+            pool = eventlet.ThreadPool(maxWorkers = 1, maxQueueSize = 1)
+            release = threading.Event()
+
+            def submit(i):
+                return pool.run(lambda: release.wait(5) and i)
+            try:
+                threads = [eventlet.spawn(submit, i) for i in range(3)]
+                eventlet.sleep(0.1)
+                # one function runs, one is queued, and the third greenlet waits for room.
+                stats = pool.stats()
+                release.set()
+                results = [t.wait() for t in threads]
+            finally:
+                release.set()
+                pool.close()
+            return stats["workers"], stats["activeWorkers"], stats["queueDepth"], results, pool.stats()["completed"]
+        self.assertEqual(runInHub(main), (1, 1, 1, [0, 1, 2], 3))
+
+
+class GreenFileTest(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        self.data = os.urandom(100000)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_write_and_read_ahead(self):
+        def main():
+            with eventlet.openFile(self.path, "wb", chunkSize = 4096, readAhead = 2) as f:
+                for i in range(0, len(self.data), 3000):
+                    f.write(self.data[i:i + 3000])
+            with eventlet.openFile(self.path, chunkSize = 4096, readAhead = 2) as f:
+                chunks = [chunk.tobytes() for chunk in f.iterChunks()]
+                f.seek(50000)
+                buffer = bytearray(10000)
+                n = f.readinto(buffer)
+                f.seek(-10, 2)
+                tail = f.read()
+            return chunks, bytes(buffer[:n]), tail
+        chunks, middle, tail = runInHub(main)
+        self.assertEqual(b"".join(chunks), self.data)
+        self.assertEqual(max(len(chunk) for chunk in chunks), 4096)
+        self.assertEqual(middle, self.data[50000:60000])
+        self.assertEqual(tail, self.data[-10:])
+
+    def test_mapped(self):
+        with open(self.path, "wb") as f:
+            f.write(self.data)
+
+        def main():
+            with eventlet.openFile(self.path, chunkSize = 4096, mapped = True) as f:
+                head = f.read(5000)
+                at = f.readAt(90000, 20000).tobytes()
+                rest = b"".join(chunk.tobytes() for chunk in f.iterChunks())
+            return head, at, rest
+        self.assertEqual(runInHub(main), (self.data[:5000], self.data[90000:], self.data[5000:]))
+
+
+class ProcessPoolTest(unittest.TestCase):
+    def test_shared_memory_round_trip(self):
+        import operator
+        reverse = operator.itemgetter(slice(None, None, -1))
+        shm = "/dev/shm"
+
+        def blocks():
+            return set(os.listdir(shm)) if os.path.isdir(shm) else set()
+
+        def main():
+            pool = eventlet.ProcessPool(maxWorkers = 1)
+            pool.sharedMemoryThreshold = 1024
+            try:
+                data = os.urandom(65536)
+                before = blocks()
+                results = pool.run(reverse, data), pool.run(reverse, bytearray(data)), pool.run(reverse, b"small")
+                # every block is unlinked once it is copied out.
+                return results, blocks() - before, data
+            finally:
+                pool.close()
+        (shared, sharedArray, small), leaked, data = runInHub(main)
+        self.assertEqual(shared, data[::-1])
+        self.assertEqual(sharedArray, bytearray(data[::-1]))
+        self.assertIsInstance(sharedArray, bytearray)
+        self.assertEqual(small, b"llams")
+        self.assertEqual(leaked, set())
+
+
+class HubThreadTest(unittest.TestCase):
+    def test_groups_and_pools_per_hub(self):
+        group = eventlet.GreenletGroup()
+
+        def inThread():
+            group.spawn(eventlet.sleep, 10)
+            eventlet.sleep(0)
+            hub = eventlet.get_hub()
+            return hub, eventlet.getThreadPool(), eventlet.runInNewThread(len, "abc")
+
+        def main():
+            hubThread = eventlet.HubThread()
+            hubThread.start()
+            hub, pool, result = hubThread.spawn(inThread).wait()
+            mainHub = eventlet.get_hub()
+            self.assertEqual(result, 3)
+            self.assertIsNot(pool, eventlet.getThreadPool())
+            self.assertIn(group, hub.groups)
+            self.assertNotIn(group, mainHub.groups)
+            hubThread.stop()
+            hubThread.exited.wait()
+            self.assertTrue(pool.closed)
+        runInHub(main)
+
+
+class ChannelTest(unittest.TestCase):
+    def test_batches_from_thread_and_close(self):
+        import threading
+
+        def produce(channel):
+            for i in range(0, 100, 10):
+                channel.putMany(range(i, i + 10))
+            channel.close()
+
+        def main():
+            channel = eventlet.Channel(capacity = 16)
+            producer = threading.Thread(target = produce, args = (channel, ))
+            producer.start()
+            batches = []
+            try:
+                while True:
+                    batches.append(channel.getMany())
+            except eventlet.ChannelClosed:
+                pass
+            producer.join()
+            try:
+                channel.put(100)
+            except eventlet.ChannelClosed:
+                closed = True
+            else:
+                closed = False
+            return batches, closed
+        batches, closed = runInHub(main)
+        self.assertEqual(sum(batches, []), list(range(100)))
+        self.assertLess(len(batches), 100)
+        self.assertTrue(closed)
+
+    def test_greenlet_to_thread(self):
+        import threading
+
+        def main():
+            channel = eventlet.Channel(capacity = 4)
+            received = []
+            consumer = threading.Thread(target = lambda: received.extend(channel))
+            consumer.start()
+            for i in range(50):
+                channel.put(i)
+            channel.close()
+            eventlet.runInNewThread(consumer.join)
+            return received
+        self.assertEqual(runInHub(main), list(range(50)))
+
+
+class ThrottledUpdaterTest(unittest.TestCase):
+    def test_qt_and_builtin_callbacks(self):
+        def main():
+            obj = eventlet.QtCore.QObject()
+            values = []
+            updaters = [
+                eventlet.ThrottledUpdater(obj.setObjectName, interval = 0.01),
+                eventlet.ThrottledUpdater(values.append, interval = 0.01),
+            ]
+            for updater in updaters:
+                updater.push("first")
+                updater.push("last")
+            eventlet.sleep(0.05)
+            return obj.objectName(), values
+        self.assertEqual(runInHub(main), ("last", ["last"]))
+
+    def test_coalesce_pushes(self):
+        def main():
+            latest, batches = [], []
+            updater = eventlet.ThrottledUpdater(latest.append, interval = 0.05)
+            accumulator = eventlet.ThrottledUpdater(batches.append, interval = 0.05, accumulate = True)
+            for i in range(100):
+                updater.push(i)
+                accumulator.push(i)
+                if i % 10 == 0:
+                    eventlet.sleep(0.001)
+            eventlet.sleep(0.1)
+            return latest, batches
+        latest, batches = runInHub(main)
+        self.assertLessEqual(len(latest), 3)
+        self.assertEqual(latest[-1], 99)
+        self.assertLessEqual(len(batches), 3)
+        self.assertEqual(sum(batches, []), list(range(100)))
+
+
+class HttpTest(unittest.TestCase):
+    def setUp(self):
+        import threading
+        try:
+            from http.server import HTTPServer, BaseHTTPRequestHandler
+            from socketserver import ThreadingMixIn
+        except ImportError:
+            from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+            from SocketServer import ThreadingMixIn
+
+        class Server(ThreadingMixIn, HTTPServer):
+            daemon_threads = True
+
+        class Handler(BaseHTTPRequestHandler):
+            # keeps the connection alive, so a client waiting for a body would hang.
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "10")
+                self.end_headers()
+                self.wfile.write(b"0123456789")
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "10")
+                self.end_headers()
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+        self.server = Server(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:%d/" % self.server.server_address[1]
+        t = threading.Thread(target = self.server.serve_forever)
+        t.daemon = True
+        t.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_read_after_buffered_body(self):
+        def main():
+            from hgoldfish.utils import http
+            response = http.get(self.url)
+            return response.read(4), list(response.iterChunks(3)), response.read(), response.content()
+        self.assertEqual(runInHub(main), (b"0123", [b"456", b"789"], b"", b"0123456789"))
+
+    def test_head_and_post(self):
+        def main():
+            from hgoldfish.utils import http
+            session = http.HttpSession(timeout = 2.0)
+            response = session.head(self.url)
+            return response.statusCode, response.content(), session.post(self.url, b"abc").content()
+        started = time.time()
+        self.assertEqual(runInHub(main), (200, b"", b"abc"))
+        self.assertLess(time.time() - started, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()